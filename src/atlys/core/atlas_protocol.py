@@ -1,11 +1,20 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable
 import hashlib
 import time
-from dataclasses import dataclass
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from dataclasses import dataclass, field
 import json
 
+import numpy as np
+
+from .atlys_adapters import ChainAdapter, RpcError
+from .atlys_implementation import BlockHeader
+from .atlys_index import TransferIndex
+from .atlys_journal import BridgeJournal
+from .atlys_lightclient import LightChainClient
+from .atlys_merkle import MerkleProof
+from .atlys_registry import EpochResult, ValidatorRegistry, column_property
+from .atlys_tracing import TransferTracer
+
 @dataclass
 class AtlysToken:
     """Native token for the Atlys protocol"""
@@ -17,14 +26,59 @@ class AtlysToken:
         """Returns the smallest unit of ATLYS token"""
         return 1 / (10 ** self.decimal_places)
     
+class RSASigner:
+    """Default bridge signer using RSA-2048 with PSS padding"""
+    def __init__(self):
+        # cryptography is imported here so that nodes which never sign
+        # (light nodes, simulations with their own signer) don't load it
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048
+        )
+        self.public_key = self.private_key.public_key()
+
+    @staticmethod
+    def _padding():
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        return padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        ), hashes.SHA256()
+
+    def sign(self, message: bytes) -> bytes:
+        pss, algorithm = self._padding()
+        return self.private_key.sign(message, pss, algorithm)
+
+    def verify(self, signature: bytes, message: bytes) -> bool:
+        pss, algorithm = self._padding()
+        try:
+            self.public_key.verify(signature, message, pss, algorithm)
+            return True
+        except Exception:
+            return False
+
 class ValidatorNode:
-    def __init__(self, stake_amount: float, public_key: str):
-        self.stake_amount = stake_amount
+    """View of one validator's row in a ValidatorRegistry"""
+    stake_amount = column_property("stake", float)
+    reputation_score = column_property("reputation", float)
+    last_validation_time = column_property("last_validation_time", float)
+    validated_transactions = column_property("validated_transactions", int)
+    slashed = column_property("slashed", bool)
+
+    def __init__(self, stake_amount: float, public_key: str, clock: Callable[[], float] = time.time):
+        # A validator owns a one-row registry until a ConsensusManager
+        # moves it into the shared one
+        self.registry = ValidatorRegistry(capacity=1)
+        self.slot = self.registry.add(public_key, stake_amount)
         self.public_key = public_key
-        self.reputation_score = 100
-        self.validated_transactions = 0
-        self.slashed = False
-        self.last_validation_time = 0
+        self.clock = clock
+        # Set by ConsensusManager.add_validator to the bridge's signature check
+        self.signature_verifier: Optional[Callable[['CrossChainTransaction'], bool]] = None
+        self.last_nonces: Dict[str, int] = {}
 
     def validate_transaction(self, transaction: 'CrossChainTransaction') -> bool:
         """Validate a single transaction"""
@@ -36,13 +90,32 @@ class ValidatorNode:
             valid_signature = self.verify_signature(transaction)
             valid_amount = self.verify_amount(transaction)
             valid_nonce = self.verify_nonce(transaction)
-            return all([valid_signature, valid_amount, valid_nonce])
+            valid = all([valid_signature, valid_amount, valid_nonce])
         except Exception:
             return False
 
+        if valid:
+            self.last_nonces[transaction.sender] = transaction.nonce
+        return valid
+
+    def verify_signature(self, transaction: 'CrossChainTransaction') -> bool:
+        """Check the bridge signature on a transaction"""
+        # A validator with nothing to check signatures against rejects
+        if transaction.signature is None or self.signature_verifier is None:
+            return False
+        return self.signature_verifier(transaction)
+
+    def verify_amount(self, transaction: 'CrossChainTransaction') -> bool:
+        """Reject zero and negative transfers"""
+        return transaction.amount > 0
+
+    def verify_nonce(self, transaction: 'CrossChainTransaction') -> bool:
+        """Reject nonces this validator has already seen from the sender"""
+        return transaction.nonce > self.last_nonces.get(transaction.sender, -1)
+
     def update_reputation(self, transaction_success: bool):
         """Enhanced reputation update with time decay"""
-        current_time = time.time()
+        current_time = self.clock()
         time_factor = min(1.0, (current_time - self.last_validation_time) / 3600)
         
         if transaction_success:
@@ -54,36 +127,187 @@ class ValidatorNode:
         self.validated_transactions += 1
 
 class ConsensusManager:
-    def __init__(self, min_validators: int = 3):
+    def __init__(
+        self,
+        min_validators: int = 3,
+        clock: Callable[[], float] = time.time,
+        committee_count: Optional[int] = None,
+        assign_by: str = "hash",
+        committee_seed: int = 0
+    ):
+        if assign_by not in ("hash", "chain_pair"):
+            raise ValueError(f"Unknown committee assignment {assign_by}")
         self.validators: Dict[str, ValidatorNode] = {}
         self.min_validators = min_validators
         self.consensus_threshold = 0.67
         self.slashing_threshold = 3  # Failed validations before slashing
+        self.clock = clock
+        self.registry = ValidatorRegistry()
+        self.slot_validators: List[ValidatorNode] = []
+        self._signature_verifier: Optional[Callable[['CrossChainTransaction'], bool]] = None
+        # The validators dict the registry was last reconciled with
+        self._synced_validators = self.validators
+
+        # Without a committee count every transaction goes to the global top
+        # min_validators; with one, the set is split into committees of
+        # min_validators that are redrawn each epoch. Committees are disjoint,
+        # so on separate validator machines their work would proceed in
+        # parallel; here the parallelism is logical and votes run in turn
+        self.committee_count = committee_count
+        self.assign_by = assign_by
+        self.committee_seed = committee_seed
+        self.epoch = 0
+        self.committees: List[np.ndarray] = []
+
+    @property
+    def signature_verifier(self) -> Optional[Callable[['CrossChainTransaction'], bool]]:
+        """Signature check every validator runs; setting it reaches validators already added"""
+        return self._signature_verifier
+
+    @signature_verifier.setter
+    def signature_verifier(self, verifier: Optional[Callable[['CrossChainTransaction'], bool]]):
+        self._signature_verifier = verifier
+        for validator in self.slot_validators:
+            validator.signature_verifier = verifier
+
+    def add_validator(self, validator_id: str, validator: ValidatorNode):
+        """Register a validator and give it the bridge's signature check"""
+        if validator_id in self.validators:
+            raise ValueError(f"Validator {validator_id} already registered")
+        self._sync_registry()
+        self.validators[validator_id] = validator
+        self._adopt(validator_id, validator)
+
+    def remove_validator(self, validator_id: str) -> ValidatorNode:
+        """Unregister a validator, which keeps its state in a registry of its own"""
+        self._sync_registry()
+        validator = self.validators.pop(validator_id)
+        self._release(validator_id)
+        return validator
+
+    def _adopt(self, validator_id: str, validator: ValidatorNode):
+        validator.signature_verifier = self.signature_verifier
+        slot = self.registry.copy_from(validator_id, validator.registry, validator.slot)
+        validator.registry = self.registry
+        validator.slot = slot
+        self.slot_validators.append(validator)
+
+    def _release(self, validator_id: str):
+        slot = self.registry.slots[validator_id]
+        validator = self.slot_validators.pop(slot)
+        # The view keeps its state in a registry of its own again
+        own = ValidatorRegistry(capacity=1)
+        own_slot = own.copy_from(validator_id, self.registry, slot)
+        self.registry.remove(validator_id)
+        validator.registry, validator.slot = own, own_slot
+        for moved in self.slot_validators[slot:]:
+            moved.slot -= 1
+        # Committee slot numbers are stale; redraw them for the same epoch
+        self.committees = []
+
+    def _sync_registry(self):
+        # add_validator and remove_validator keep the registry in step. A new
+        # dict assigned to validators, or entries inserted into or deleted
+        # from it directly, change its identity or length and are reconciled
+        # in full; replacing an entry in place is not detected
+        if self.validators is self._synced_validators and len(self.validators) == len(self.slot_validators):
+            return
+        self._synced_validators = self.validators
+        for validator_id in list(self.registry.ids):
+            if self.validators.get(validator_id) is not self.slot_validators[self.registry.slots[validator_id]]:
+                self._release(validator_id)
+        for validator_id, validator in self.validators.items():
+            if validator.registry is not self.registry:
+                self._adopt(validator_id, validator)
 
     def validate_transaction(self, transaction: 'CrossChainTransaction') -> bool:
+        if self.committee_count is not None:
+            return self.validate_batch([transaction])[0]
         if len(self.validators) < self.min_validators:
             raise ValueError(f"Insufficient validators. Need at least {self.min_validators}")
 
         # Select validators based on reputation and stake
-        active_validators = self.get_active_validators()
+        self._sync_registry()
+        slots = self.registry.top_active(self.min_validators)
         
-        # Collect votes
-        votes = []
-        for validator in active_validators:
-            vote = validator.validate_transaction(transaction)
-            votes.append(vote)
-            validator.update_reputation(vote)
-            
-            # Check for slashing conditions
-            if not vote and validator.reputation_score < 20:
-                self.slash_validator(validator)
+        # Collect votes, then update reputations in one batch
+        votes = np.array(
+            [self.slot_validators[slot].validate_transaction(transaction) for slot in slots],
+            dtype=bool
+        )
+        return self._tally(slots, votes)
+
+    def _tally(self, slots: np.ndarray, votes: np.ndarray) -> bool:
+        if len(slots) == 0:
+            return False
+        self.registry.record_votes(slots, votes, self.clock())
+
+        # Check for slashing conditions
+        failed = slots[~votes & (self.registry.reputation[slots] < 20)]
+        self.registry.slash(failed, stake_fraction=0.0)
 
         # Calculate consensus
-        positive_votes = sum(1 for v in votes if v)
+        positive_votes = int(votes.sum())
         consensus_reached = positive_votes / len(votes) >= self.consensus_threshold
         
         return consensus_reached
 
+    def rotate_committees(self) -> List[np.ndarray]:
+        """Draw the current epoch's committees, weighting validators by stake and reputation"""
+        if len(self.validators) < self.min_validators:
+            raise ValueError(f"Insufficient validators. Need at least {self.min_validators}")
+        self._sync_registry()
+        rng = np.random.default_rng([self.committee_seed, self.epoch])
+        self.committees = self.registry.sample_committees(self.committee_count, self.min_validators, rng)
+        if not self.committees:
+            raise ValueError(f"Insufficient active validators. Need at least {self.min_validators}")
+        return self.committees
+
+    def committee_index(self, transaction: 'CrossChainTransaction') -> int:
+        """Committee that validates a transaction in the current epoch"""
+        if not self.committees:
+            self.rotate_committees()
+        if self.assign_by == "chain_pair":
+            # Keeps each route on one committee, at the cost of balance when
+            # there are fewer routes than committees
+            route = f"{transaction.source_chain}:{transaction.destination_chain}"
+            key = hashlib.sha256(route.encode()).hexdigest()
+        else:
+            key = transaction.tx_hash
+        return int(key[:16], 16) % len(self.committees)
+
+    def _collect_votes(self, committee: np.ndarray, transactions: List['CrossChainTransaction']) -> np.ndarray:
+        members = [self.slot_validators[slot] for slot in committee]
+        votes = np.zeros((len(transactions), len(members)), dtype=bool)
+        for row, transaction in enumerate(transactions):
+            for column, member in enumerate(members):
+                votes[row, column] = member.validate_transaction(transaction)
+        return votes
+
+    def validate_batch(self, transactions: List['CrossChainTransaction']) -> List[bool]:
+        """Validate transactions in bulk, each committee working through its share"""
+        if self.committee_count is None:
+            return [self.validate_transaction(transaction) for transaction in transactions]
+
+        shares: Dict[int, List[int]] = {}
+        for position, transaction in enumerate(transactions):
+            shares.setdefault(self.committee_index(transaction), []).append(position)
+        work = [
+            (self.committees[index], [transactions[position] for position in positions])
+            for index, positions in shares.items()
+        ]
+
+        # Votes are pure Python, so threads would only add overhead under the GIL
+        vote_matrices = [self._collect_votes(*item) for item in work]
+
+        results = [False] * len(transactions)
+        for (committee, _), positions, votes in zip(work, shares.values(), vote_matrices):
+            for position, row in zip(positions, votes):
+                # Members slashed earlier in the batch lose their remaining votes
+                active = ~self.registry.slashed[committee]
+                results[position] = self._tally(committee[active], row[active])
+        return results
+
     def slash_validator(self, validator: ValidatorNode):
         """Slash a validator for malicious behavior"""
         validator.slashed = True
@@ -92,11 +316,17 @@ class ConsensusManager:
 
     def get_active_validators(self) -> List[ValidatorNode]:
         """Get active validators sorted by reputation and stake"""
-        return sorted(
-            [v for v in self.validators.values() if not v.slashed],
-            key=lambda v: (v.reputation_score, v.stake_amount),
-            reverse=True
-        )[:self.min_validators]
+        self._sync_registry()
+        return [self.slot_validators[slot] for slot in self.registry.top_active(self.min_validators)]
+
+    def process_epoch(self, reward: float = 0.0, **options) -> EpochResult:
+        """Run epoch-level reputation decay, slashing and reward payout over the whole validator set"""
+        self._sync_registry()
+        result = self.registry.process_epoch(self.clock(), reward, **options)
+        # The next validation draws fresh committees from the post-epoch set
+        self.epoch += 1
+        self.committees = []
+        return result
 
 @dataclass
 class CrossChainTransaction:
@@ -108,13 +338,54 @@ class CrossChainTransaction:
     amount: float
     token_symbol: str
     nonce: int  # Add nonce for replay protection
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
     status: str = "pending"
     tx_hash: Optional[str] = None
+    signature: Optional[bytes] = None
+    # Hashes of the bridge's calls on external chains
+    lock_tx: Optional[str] = None
+    release_tx: Optional[str] = None
+    # When the current call went out, and earlier calls for the same leg that it replaced
+    submitted_at: Optional[float] = None
+    superseded_txs: List[str] = field(default_factory=list)
     
     def __post_init__(self):
         self.tx_hash = self.calculate_hash()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields covered by the bridge signature"""
+        return {
+            'source_chain': self.source_chain,
+            'destination_chain': self.destination_chain,
+            'sender': self.sender,
+            'receiver': self.receiver,
+            'amount': self.amount,
+            'token_symbol': self.token_symbol,
+            'nonce': self.nonce,
+            'timestamp': self.timestamp
+        }
     
+    def to_record(self) -> Dict[str, Any]:
+        """Everything needed to rebuild the transaction, in JSON-safe form"""
+        record = self.to_dict()
+        record['status'] = self.status
+        record['tx_hash'] = self.tx_hash
+        record['signature'] = self.signature.hex() if self.signature is not None else None
+        record['lock_tx'] = self.lock_tx
+        record['release_tx'] = self.release_tx
+        record['submitted_at'] = self.submitted_at
+        record['superseded_txs'] = list(self.superseded_txs)
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'CrossChainTransaction':
+        values = dict(record)
+        signature = values.pop('signature')
+        values.pop('tx_hash')
+        transaction = cls(**values)
+        transaction.signature = bytes.fromhex(signature) if signature is not None else None
+        return transaction
+
     def calculate_hash(self) -> str:
         """Calculate transaction hash"""
         tx_string = f"{self.source_chain}{self.destination_chain}{self.sender}{self.receiver}{self.amount}{self.token_symbol}{self.nonce}{self.timestamp}"
@@ -130,19 +401,35 @@ def slash_validator(self, validator: ValidatorNode):
 
 class EnhancedCrossChainBridge:
     """Enhanced bridge for managing cross-chain transactions"""
-    def __init__(self):
+    def __init__(
+        self,
+        signer: Any = None,
+        clock: Callable[[], float] = time.time,
+        tracer: Optional[TransferTracer] = None,
+        journal: Optional[BridgeJournal] = None,
+        resubmit_after: float = 600.0
+    ):
         self.supported_chains: Dict[str, Any] = {}
+        self.light_clients: Dict[str, LightChainClient] = {}
+        self.adapters: Dict[str, ChainAdapter] = {}
         self.pending_transactions: Dict[str, List[CrossChainTransaction]] = {}
         self.completed_transactions: List[CrossChainTransaction] = []
-        self.consensus_manager = ConsensusManager()
+        self.transfer_index = TransferIndex()
+        self.consensus_manager = ConsensusManager(clock=clock)
+        self.consensus_manager.signature_verifier = self.verify_transaction
         self.token = AtlysToken()
+        self.clock = clock
+        self.sender_nonces: Dict[str, int] = {}
+        # Samples nothing unless configured, so tracing costs one dict lookup per stage
+        self.tracer = tracer if tracer is not None else TransferTracer()
+        # Without a journal all bridge state is in memory only
+        self.journal = journal
+        # Seconds an external call may go without a receipt before it is
+        # assumed dropped and sent again
+        self.resubmit_after = resubmit_after
         
-        # Generate bridge keys
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
-        self.public_key = self.private_key.public_key()
+        # Generate bridge keys unless a signer is supplied
+        self.signer = signer if signer is not None else RSASigner()
     
     def register_chain(self, chain_id: str, chain_interface: Any):
         """Register a new blockchain with the bridge"""
@@ -150,7 +437,48 @@ class EnhancedCrossChainBridge:
             raise ValueError(f"Chain {chain_id} already registered")
         
         self.supported_chains[chain_id] = chain_interface
-        self.pending_transactions[chain_id] = []
+        self.pending_transactions.setdefault(chain_id, [])
+        if isinstance(chain_interface, ChainAdapter):
+            self.adapters[chain_id] = chain_interface
+
+    def register_external_chain(self, chain_id: str, adapter: ChainAdapter) -> ChainAdapter:
+        """Register a chain the bridge settles on through an adapter's lock and release calls"""
+        self.register_chain(chain_id, adapter)
+        return adapter
+
+    def register_light_chain(
+        self,
+        chain_id: str,
+        checkpoint_hash: str,
+        checkpoint_height: int = 0,
+        difficulty: int = 4
+    ) -> LightChainClient:
+        """Register a remote chain tracked by headers only, trusted from a checkpoint block"""
+        client = LightChainClient(chain_id, checkpoint_hash, checkpoint_height, difficulty)
+        self.register_chain(chain_id, client)
+        self.light_clients[chain_id] = client
+        return client
+
+    def submit_headers(self, chain_id: str, headers: List[BlockHeader]) -> bool:
+        """Feed new block headers for a light chain"""
+        if chain_id not in self.light_clients:
+            raise ValueError(f"Chain {chain_id} is not a light chain")
+        return self.light_clients[chain_id].add_headers(headers)
+
+    def verify_transfer_inclusion(
+        self,
+        chain_id: str,
+        transaction: Dict[str, Any],
+        block_height: int,
+        proof: MerkleProof,
+        min_confirmations: int = 1
+    ) -> bool:
+        """Confirm a transfer record was included on a light chain using a full node's Merkle proof"""
+        if chain_id not in self.light_clients:
+            raise ValueError(f"Chain {chain_id} is not a light chain")
+        return self.light_clients[chain_id].verify_inclusion(
+            transaction, block_height, proof, min_confirmations
+        )
     
     def initiate_cross_chain_transfer(
         self,
@@ -162,6 +490,20 @@ class EnhancedCrossChainBridge:
         token_symbol: str = "ATLYS"
     ) -> CrossChainTransaction:
         """Initiate a new cross-chain transfer"""
+        transaction = self.create_transfer(sender, receiver, amount, source_chain, destination_chain, token_symbol)
+        self.submit_transfers([transaction])
+        return transaction
+
+    def create_transfer(
+        self,
+        sender: str,
+        receiver: str,
+        amount: float,
+        source_chain: str,
+        destination_chain: str,
+        token_symbol: str = "ATLYS"
+    ) -> CrossChainTransaction:
+        """Build and sign a transfer with the sender's next nonce, without validating it yet"""
         if source_chain not in self.supported_chains or destination_chain not in self.supported_chains:
             raise ValueError("Unsupported chain")
             
@@ -171,67 +513,251 @@ class EnhancedCrossChainBridge:
             sender=sender,
             receiver=receiver,
             amount=amount,
-            token_symbol=token_symbol
+            token_symbol=token_symbol,
+            nonce=self.sender_nonces.get(sender, 0),
+            timestamp=self.clock()
         )
+        self.sender_nonces[sender] = transaction.nonce + 1
         
         # Sign the transaction
-        message = json.dumps(transaction.to_dict(), sort_keys=True).encode()
-        transaction.signature = self.private_key.sign(
-            message,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        
-        # Validate through consensus
-        if self.consensus_manager.validate_transaction(transaction):
-            transaction.status = "validated"
-            self.pending_transactions[source_chain].append(transaction)
-        else:
-            transaction.status = "rejected"
-            
+        with self.tracer.span(transaction.tx_hash, "sign"):
+            message = json.dumps(transaction.to_dict(), sort_keys=True).encode()
+            transaction.signature = self.signer.sign(message)
         return transaction
+
+    def submit_transfers(self, transactions: List[CrossChainTransaction]) -> None:
+        """Validate created transfers through consensus in one batch and queue the accepted ones"""
+        for transaction in transactions:
+            self.tracer.begin(transaction.tx_hash, "consensus")
+        results = self.consensus_manager.validate_batch(transactions)
+
+        for transaction, validated in zip(transactions, results):
+            self.tracer.end(transaction.tx_hash, "consensus")
+            transaction.status = "validated" if validated else "rejected"
+            if self.journal is not None:
+                self.journal.record_transfer(transaction.to_record())
+
+            if validated:
+                self.pending_transactions[transaction.source_chain].append(transaction)
+                self.tracer.begin(transaction.tx_hash, "queue_wait")
+            else:
+                self.tracer.finish(transaction.tx_hash, transaction.status)
+
+        # One fsync per batch makes every accepted transfer durable before
+        # the caller sees it as validated
+        if self.journal is not None:
+            self.journal.commit()
     
     def verify_transaction(self, transaction: CrossChainTransaction) -> bool:
         """Verify a transaction's signature"""
-        try:
-            message = json.dumps(transaction.to_dict(), sort_keys=True).encode()
-            self.public_key.verify(
-                transaction.signature,
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except Exception:
-            return False
+        message = json.dumps(transaction.to_dict(), sort_keys=True).encode()
+        return self.signer.verify(transaction.signature, message)
     
+    def get_transfer(self, tx_hash: str) -> Optional[CrossChainTransaction]:
+        """Look up a completed transfer by hash, falling back to the journal archive"""
+        transaction = self.transfer_index.get(tx_hash)
+        if transaction is None and self.journal is not None:
+            record = self.journal.find_archived(tx_hash)
+            if record is not None:
+                transaction = CrossChainTransaction.from_record(record)
+        return transaction
+
+    def get_transfers_between(
+        self,
+        source_chain: str,
+        destination_chain: str,
+        cursor: Optional[int] = None,
+        limit: int = 50
+    ) -> Tuple[List[CrossChainTransaction], Optional[int]]:
+        """Page through completed transfers from one chain to another"""
+        return self.transfer_index.get_chain_pair(source_chain, destination_chain, cursor, limit)
+
     def process_pending_transactions(self):
-        """Process all pending transactions across chains"""
+        """Advance pending transfers through lock on the source chain and release on the destination"""
+        in_flight = [tx for transactions in self.pending_transactions.values() for tx in transactions]
+        for transaction in in_flight:
+            if transaction.status == "validated":
+                self.tracer.end(transaction.tx_hash, "queue_wait")
+                self.tracer.begin(transaction.tx_hash, "settle")
+
+        # Each leg goes out as one batch per chain adapter. Chains without an
+        # adapter have nothing to call, so their leg passes at once; calls to
+        # external chains may need several rounds to confirm.
+        self._submit_leg(in_flight, "validated", "source_chain", "lock", "lock_tx", "locking", "locked")
+        self._confirm_leg(in_flight, "locking", "source_chain", "lock", "lock_tx", "locked", "validated")
+        # A failed release leaves the funds locked on the source chain for refund
+        self._submit_leg(in_flight, "locked", "destination_chain", "release", "release_tx", "releasing", "completed")
+        self._confirm_leg(in_flight, "releasing", "destination_chain", "release", "release_tx", "completed", "locked")
+
+        # Clear processed transactions
         for chain_id, transactions in self.pending_transactions.items():
-            for transaction in transactions:
-                if transaction.status == "validated":
-                    # Execute the cross-chain transfer
-                    try:
-                        source_chain = self.supported_chains[transaction.source_chain]
-                        dest_chain = self.supported_chains[transaction.destination_chain]
-                        
-                        # Implement the actual transfer logic here
-                        # This would involve locking tokens on source chain
-                        # and minting/releasing on destination chain
-                        
-                        transaction.status = "completed"
-                        self.completed_transactions.append(transaction)
-                    except Exception as e:
-                        transaction.status = "failed"
-                        print(f"Transaction failed: {e}")
-            
-            # Clear processed transactions
             self.pending_transactions[chain_id] = [
-                tx for tx in transactions if tx.status == "pending"
+                tx for tx in transactions if tx.status not in ("completed", "failed")
             ]
+
+        if self.journal is not None:
+            self.journal.commit()
+            self._archive_completed()
+
+    def _submit_leg(
+        self,
+        transactions: List[CrossChainTransaction],
+        status: str,
+        chain_field: str,
+        method: str,
+        tx_field: str,
+        submitted_status: str,
+        skipped_status: str
+    ):
+        batches: Dict[str, List[CrossChainTransaction]] = {}
+        for transaction in transactions:
+            if transaction.status == status:
+                batches.setdefault(getattr(transaction, chain_field), []).append(transaction)
+
+        for chain_id, batch in batches.items():
+            adapter = self.adapters.get(chain_id)
+            if adapter is None:
+                for transaction in batch:
+                    self._set_status(transaction, skipped_status)
+                continue
+            try:
+                tx_hashes = getattr(adapter, method)(batch)
+            except RpcError as e:
+                if not e.delivered:
+                    # Left in place to be resubmitted next round
+                    print(f"Chain {chain_id} unavailable: {e}")
+                    continue
+                tx_hashes = [e] * len(batch)
+            except Exception as e:
+                tx_hashes = [e] * len(batch)
+            for transaction, tx_hash in zip(batch, tx_hashes):
+                if isinstance(tx_hash, RpcError) and not tx_hash.delivered:
+                    continue
+                if tx_hash is None:
+                    self._set_status(transaction, "failed")
+                    continue
+                # A call that may have gone through without returning a hash
+                # is settled from the contract's record of the transfer id
+                if isinstance(tx_hash, Exception):
+                    tx_hash = None
+                setattr(transaction, tx_field, tx_hash)
+                transaction.submitted_at = self.clock()
+                self._set_status(transaction, submitted_status, **{
+                    tx_field: tx_hash,
+                    "submitted_at": transaction.submitted_at,
+                    "superseded_txs": list(transaction.superseded_txs)
+                })
+
+    def _confirm_leg(
+        self,
+        transactions: List[CrossChainTransaction],
+        status: str,
+        chain_field: str,
+        method: str,
+        tx_field: str,
+        confirmed_status: str,
+        retry_status: str
+    ):
+        batches: Dict[str, List[CrossChainTransaction]] = {}
+        for transaction in transactions:
+            if transaction.status == status:
+                batches.setdefault(getattr(transaction, chain_field), []).append(transaction)
+
+        now = self.clock()
+        for chain_id, batch in batches.items():
+            adapter = self.adapters[chain_id]
+            # Every call sent for a leg is checked, not just the latest. The
+            # bridge contract refuses a transfer id it has already seen, so at
+            # most one of them can succeed and a resubmission never moves
+            # funds twice; a reverted call may be such a refusal.
+            attempts = [
+                ([getattr(tx, tx_field)] if getattr(tx, tx_field) else []) + tx.superseded_txs
+                for tx in batch
+            ]
+            try:
+                outcomes = adapter.receipt_statuses([tx_hash for tx_hashes in attempts for tx_hash in tx_hashes])
+            except Exception as e:
+                print(f"Chain {chain_id} unavailable: {e}")
+                continue
+
+            unsettled: List[Tuple[CrossChainTransaction, bool, bool, bool]] = []
+            position = 0
+            for transaction, tx_hashes in zip(batch, attempts):
+                results = outcomes[position:position + len(tx_hashes)]
+                position += len(tx_hashes)
+                if True in results:
+                    # Record the call that went through, which may be an earlier one
+                    self._confirm(transaction, confirmed_status, tx_field, tx_hashes[results.index(True)])
+                    continue
+                # A call whose outcome is unknown has no hash to wait on
+                unknown = getattr(transaction, tx_field) is None
+                pending = unknown or None in results
+                latest_reverted = not unknown and results[0] is False
+                timed_out = (
+                    transaction.submitted_at is not None
+                    and now - transaction.submitted_at >= self.resubmit_after
+                )
+                # Receipts alone never fail a transfer or give up on a call;
+                # the contract is asked whether the transfer id went through
+                if not pending or unknown or timed_out:
+                    unsettled.append((transaction, pending, latest_reverted, timed_out))
+            if not unsettled:
+                continue
+
+            try:
+                executed = adapter.executed(method, [transaction for transaction, *_ in unsettled])
+            except Exception as e:
+                print(f"Chain {chain_id} unavailable: {e}")
+                continue
+            for (transaction, pending, latest_reverted, timed_out), done in zip(unsettled, executed):
+                if done:
+                    self._confirm(transaction, confirmed_status, tx_field, getattr(transaction, tx_field))
+                elif done is None:
+                    continue
+                elif not pending or (timed_out and latest_reverted):
+                    # Every call reverted, or the latest did and the earlier
+                    # ones were never mined in time
+                    self._set_status(transaction, "failed")
+                elif timed_out:
+                    # Presumed dropped: submitted again by the next round. Not
+                    # journaled, as recovery would time the call out again.
+                    if getattr(transaction, tx_field) is not None:
+                        transaction.superseded_txs.append(getattr(transaction, tx_field))
+                    transaction.status = retry_status
+
+    def _confirm(self, transaction: CrossChainTransaction, status: str, tx_field: str, tx_hash: Optional[str]):
+        setattr(transaction, tx_field, tx_hash)
+        transaction.superseded_txs = []
+        self._set_status(transaction, status, **{tx_field: tx_hash, "superseded_txs": []})
+
+    def _set_status(self, transaction: CrossChainTransaction, status: str, **fields: Any):
+        transaction.status = status
+        if status == "completed":
+            self.completed_transactions.append(transaction)
+            self.transfer_index.add(transaction)
+        if status in ("completed", "failed"):
+            self.tracer.end(transaction.tx_hash, "settle")
+            self.tracer.finish(transaction.tx_hash, status)
+        # "locked" is not journaled: recovery re-checks the lock receipt, or
+        # passes the lock leg again on a chain without an adapter
+        if self.journal is not None and status != "locked":
+            self.journal.record_status(transaction.tx_hash, status, **fields)
+
+    def _archive_completed(self):
+        """Hand the oldest completed transfers to the journal archive once too many are in memory"""
+        archived = self.journal.archive_overflow()
+        if archived:
+            del self.completed_transactions[:len(archived)]
+            self.transfer_index.evict(archived)
+
+    def recover_from_journal(self):
+        """Reload pending and recent completed transfers and sender nonces from the journal"""
+        state = self.journal.state
+        self.sender_nonces = dict(state.sender_nonces)
+        for record in state.pending.values():
+            transaction = CrossChainTransaction.from_record(record)
+            self.pending_transactions.setdefault(transaction.source_chain, []).append(transaction)
+        for record in state.completed:
+            transaction = CrossChainTransaction.from_record(record)
+            self.completed_transactions.append(transaction)
+            self.transfer_index.add(transaction)
@@ -0,0 +1,349 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from .atlas_protocol import CrossChainTransaction
+
+# Bridge contract entry points, each taking (transfer id, account, amount in base units)
+LOCK_SIGNATURE = "lock(bytes32,address,uint256)"
+RELEASE_SIGNATURE = "release(bytes32,address,uint256)"
+# Views reporting whether the contract has executed a lock or release for a transfer id
+LOCKED_SIGNATURE = "locked(bytes32)"
+RELEASED_SIGNATURE = "released(bytes32)"
+# Calls that can be resent safely when a request's fate is unknown
+READ_ONLY_METHODS = frozenset({
+    "eth_blockNumber", "eth_call", "eth_chainId", "eth_getBlockByNumber", "eth_getTransactionReceipt"
+})
+
+
+# A chain tx hash, None if the call was refused outright, or the error that
+# stopped it: an RpcError that was not delivered means the call was never
+# made, any other error leaves its outcome unknown
+SubmitResult = Union[str, None, Exception]
+
+
+class ChainAdapter(ABC):
+    """Batch interface through which the bridge moves funds on an external chain"""
+
+    @abstractmethod
+    def lock(self, transfers: Sequence['CrossChainTransaction']) -> List[SubmitResult]:
+        """Submit lock calls for transfers leaving this chain; returns a SubmitResult each"""
+
+    @abstractmethod
+    def release(self, transfers: Sequence['CrossChainTransaction']) -> List[SubmitResult]:
+        """Submit release calls for transfers arriving on this chain; returns a SubmitResult each"""
+
+    @abstractmethod
+    def receipt_statuses(self, tx_hashes: Sequence[str]) -> List[Optional[bool]]:
+        """Outcome of submitted calls: True or False once final, None while still pending"""
+
+    @abstractmethod
+    def executed(self, method: str, transfers: Sequence['CrossChainTransaction']) -> List[Optional[bool]]:
+        """Whether the contract has finally executed a "lock" or "release" of each transfer, None if unknown"""
+
+
+class RpcError(Exception):
+    """Error object returned by a JSON-RPC endpoint, or a failed HTTP exchange"""
+    def __init__(self, message: str, code: Optional[int] = None, delivered: bool = True):
+        super().__init__(message)
+        self.code = code
+        # False only when the request provably never reached the endpoint
+        self.delivered = delivered
+
+
+@dataclass
+class RpcStats:
+    round_trips: int = 0  # HTTP requests sent, each carrying one call or one batch
+    calls: int = 0  # JSON-RPC calls inside those requests
+    connections: int = 0  # TCP connections opened
+    cache_hits: int = 0  # lookups answered without a call
+    confirmed: int = 0  # submitted calls whose receipts came back successful and final
+
+    def round_trips_per_confirmed(self) -> float:
+        """HTTP requests spent for each call confirmed, the cost of settling one leg of a transfer"""
+        return self.round_trips / self.confirmed if self.confirmed else 0.0
+
+
+class JsonRpcClient:
+    """JSON-RPC over HTTP with a small pool of keep-alive connections to one endpoint"""
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 10.0):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self.timeout = timeout
+        self.stats = RpcStats()
+        self._ids = itertools.count(1)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RpcError(f"{self.url}: no free connection in the pool", delivered=False)
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.stats.connections += 1
+        return self.connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def _post(self, payload: Any, idempotent: bool) -> Any:
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        while True:
+            connection, reused = self._acquire()
+            sent = reusable = False
+            try:
+                connection.request("POST", self.path, body, headers)
+                sent = True
+                response = connection.getresponse()
+                data = response.read()
+                reusable = not response.will_close
+            except (http.client.HTTPException, OSError) as e:
+                # The server may have closed an idle connection. A request
+                # that was not fully sent cannot have been acted on; one that
+                # was is only resent if it has no side effects
+                if reused and (not sent or idempotent):
+                    continue
+                raise RpcError(f"{self.url}: {e}", delivered=sent) from e
+            finally:
+                self._release(connection, reusable)
+            self.stats.round_trips += 1
+            if response.status != 200:
+                raise RpcError(f"{self.url}: HTTP {response.status}")
+            return json.loads(data)
+
+    def batch(self, calls: Sequence[Tuple[str, List[Any]]]) -> List[Any]:
+        """Send calls in one request; each result is the call's value or an RpcError"""
+        if not calls:
+            return []
+        requests = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+            for method, params in calls
+        ]
+        self.stats.calls += len(requests)
+        idempotent = all(method in READ_ONLY_METHODS for method, _ in calls)
+        responses = self._post(requests if len(requests) > 1 else requests[0], idempotent)
+        if isinstance(responses, dict):
+            responses = [responses]
+        # Batch responses may arrive in any order
+        by_id = {response.get("id"): response for response in responses}
+        results: List[Any] = []
+        for request in requests:
+            response = by_id.get(request["id"])
+            if response is None:
+                results.append(RpcError(f"No response to {request['method']}"))
+            elif "error" in response:
+                error = response["error"]
+                results.append(RpcError(error.get("message", "RPC error"), error.get("code")))
+            else:
+                results.append(response.get("result"))
+        return results
+
+    def call(self, method: str, params: List[Any]) -> Any:
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle = []
+
+
+_clients: Dict[str, JsonRpcClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str) -> JsonRpcClient:
+    """Shared client for an endpoint, so every adapter using it draws from one connection pool"""
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = JsonRpcClient(url)
+        return _clients[url]
+
+
+def function_selector(signature: str) -> str:
+    """First four bytes of the Keccak-256 hash of a Solidity function signature"""
+    # eth_utils comes with web3 and is only needed when selectors aren't given
+    from eth_utils import keccak
+
+    return "0x" + keccak(text=signature)[:4].hex()
+
+
+def _encode_word(value: int) -> str:
+    if value < 0 or value >= 1 << 256:
+        raise ValueError(f"{value} does not fit in a uint256")
+    return f"{value:064x}"
+
+
+def _encode_address(address: str) -> str:
+    digits = address[2:] if address.startswith("0x") else address
+    if len(digits) != 40:
+        raise ValueError(f"Not an EVM address: {address}")
+    return _encode_word(int(digits, 16))
+
+
+class EvmRpcAdapter(ChainAdapter):
+    """Bridge contract on an EVM chain, called through an operator account unlocked on the node"""
+    def __init__(
+        self,
+        endpoint: str,
+        bridge_contract: str,
+        operator: str,
+        confirmations: int = 1,
+        decimals: int = 18,
+        lock_selector: Optional[str] = None,
+        release_selector: Optional[str] = None,
+        locked_selector: Optional[str] = None,
+        released_selector: Optional[str] = None,
+        client: Optional[JsonRpcClient] = None,
+        receipt_cache_size: int = 10_000,
+        head_ttl: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.client = client if client is not None else get_client(endpoint)
+        self.bridge_contract = bridge_contract
+        self.operator = operator
+        self.confirmations = confirmations
+        self.decimals = decimals
+        self.lock_selector = lock_selector or function_selector(LOCK_SIGNATURE)
+        self.release_selector = release_selector or function_selector(RELEASE_SIGNATURE)
+        self.locked_selector = locked_selector or function_selector(LOCKED_SIGNATURE)
+        self.released_selector = released_selector or function_selector(RELEASED_SIGNATURE)
+        self.clock = clock
+
+        # Receipts are only cached once final, so a cached answer never changes
+        self.receipt_cache_size = receipt_cache_size
+        self._receipts: 'OrderedDict[str, bool]' = OrderedDict()
+        # The head block number is reused for head_ttl seconds
+        self.head_ttl = head_ttl
+        self._head: Optional[Tuple[int, float]] = None
+
+    def encode_call(self, selector: str, transfer: 'CrossChainTransaction', account: str) -> str:
+        """Calldata for a lock or release of a transfer, its hash serving as the transfer id"""
+        amount = Decimal(str(transfer.amount)).scaleb(self.decimals)
+        if amount != amount.to_integral_value():
+            raise ValueError(f"Amount {transfer.amount} has more than {self.decimals} decimals")
+        return (
+            selector
+            + _encode_word(int(transfer.tx_hash, 16))
+            + _encode_address(account)
+            + _encode_word(int(amount))
+        )
+
+    def _send(self, selector: str, transfers: Sequence['CrossChainTransaction'], accounts: List[str]) -> List[SubmitResult]:
+        calls: List[Tuple[str, List[Any]]] = []
+        positions: List[int] = []
+        for position, (transfer, account) in enumerate(zip(transfers, accounts)):
+            try:
+                data = self.encode_call(selector, transfer, account)
+            except ValueError:
+                continue
+            calls.append(("eth_sendTransaction", [{"from": self.operator, "to": self.bridge_contract, "data": data}]))
+            positions.append(position)
+
+        # Only calls that cannot be encoded are refused; an error object from
+        # the node (nonce clash, underpriced gas, node busy) is passed back so
+        # the call is retried
+        tx_hashes: List[SubmitResult] = [None] * len(transfers)
+        for position, result in zip(positions, self.client.batch(calls)):
+            tx_hashes[position] = result
+        return tx_hashes
+
+    def lock(self, transfers: Sequence['CrossChainTransaction']) -> List[SubmitResult]:
+        return self._send(self.lock_selector, transfers, [transfer.sender for transfer in transfers])
+
+    def release(self, transfers: Sequence['CrossChainTransaction']) -> List[SubmitResult]:
+        return self._send(self.release_selector, transfers, [transfer.receiver for transfer in transfers])
+
+    def _cache_receipt(self, tx_hash: str, success: bool) -> None:
+        self._receipts[tx_hash] = success
+        if len(self._receipts) > self.receipt_cache_size:
+            self._receipts.popitem(last=False)
+
+    def receipt_statuses(self, tx_hashes: Sequence[str]) -> List[Optional[bool]]:
+        statuses: List[Optional[bool]] = [None] * len(tx_hashes)
+        missing: List[int] = []
+        for position, tx_hash in enumerate(tx_hashes):
+            if tx_hash in self._receipts:
+                self._receipts.move_to_end(tx_hash)
+                statuses[position] = self._receipts[tx_hash]
+                self.client.stats.cache_hits += 1
+            else:
+                missing.append(position)
+        if not missing:
+            return statuses
+
+        calls: List[Tuple[str, List[Any]]] = [("eth_getTransactionReceipt", [tx_hashes[p]]) for p in missing]
+        # The head is only needed to count confirmations; it rides in the same batch
+        refresh_head = self.confirmations > 1 and (
+            self._head is None or self.clock() - self._head[1] >= self.head_ttl
+        )
+        if refresh_head:
+            calls.append(("eth_blockNumber", []))
+        elif self.confirmations > 1:
+            self.client.stats.cache_hits += 1
+        results = self.client.batch(calls)
+        if refresh_head:
+            head = results.pop()
+            if isinstance(head, RpcError):
+                return statuses
+            self._head = (int(head, 16), self.clock())
+
+        for position, receipt in zip(missing, results):
+            if receipt is None or isinstance(receipt, RpcError) or receipt.get("blockNumber") is None:
+                continue
+            if self.confirmations > 1:
+                depth = self._head[0] - int(receipt["blockNumber"], 16) + 1
+                if depth < self.confirmations:
+                    continue
+            success = receipt.get("status") == "0x1"
+            self._cache_receipt(tx_hashes[position], success)
+            if success:
+                self.client.stats.confirmed += 1
+            statuses[position] = success
+        return statuses
+
+    def executed(self, method: str, transfers: Sequence['CrossChainTransaction']) -> List[Optional[bool]]:
+        selector = self.locked_selector if method == "lock" else self.released_selector
+        # Read the contract at the newest block with enough confirmations
+        block = "latest"
+        if self.confirmations > 1:
+            if self._head is None or self.clock() - self._head[1] >= self.head_ttl:
+                self._head = (int(self.client.call("eth_blockNumber", []), 16), self.clock())
+            else:
+                self.client.stats.cache_hits += 1
+            block = hex(max(0, self._head[0] - self.confirmations + 1))
+        calls: List[Tuple[str, List[Any]]] = [
+            ("eth_call", [{"to": self.bridge_contract, "data": selector + _encode_word(int(t.tx_hash, 16))}, block])
+            for t in transfers
+        ]
+        # An empty result means there is no contract to answer at that address
+        return [
+            None if isinstance(result, RpcError) or result in (None, "0x") else int(result, 16) != 0
+            for result in self.client.batch(calls)
+        ]
@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class BlockUndo:
+    """State needed to disconnect a block from the active chain"""
+    # Balance of every touched address before the block was applied,
+    # None when the address did not exist yet
+    previous_balances: Dict[str, Optional[float]] = field(default_factory=dict)
+
+
+@dataclass
+class BlockNode:
+    """A block in the tree together with its fork-choice metadata"""
+    block: Any
+    parent_hash: Optional[str]
+    height: int
+    cumulative_work: int
+    undo: Optional[BlockUndo] = None
+
+
+class BlockTree:
+    """Hash-indexed tree of every known block with heaviest-tip fork choice"""
+    def __init__(self, genesis_block: Any, genesis_work: int, genesis_height: int = 0):
+        self.nodes: Dict[str, BlockNode] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.tips: Set[str] = set()
+
+        # The root is normally the genesis block, but a node restored from a
+        # state snapshot roots its tree at the snapshot block instead
+        genesis = BlockNode(
+            block=genesis_block,
+            parent_hash=None,
+            height=genesis_height,
+            cumulative_work=genesis_work
+        )
+        self.genesis_hash = genesis_block.hash
+        self.nodes[self.genesis_hash] = genesis
+        self.children[self.genesis_hash] = []
+        self.tips.add(self.genesis_hash)
+        self.best_tip_hash = self.genesis_hash
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self.nodes
+
+    def get_node(self, block_hash: str) -> BlockNode:
+        """Return the node stored for a block hash"""
+        if block_hash not in self.nodes:
+            raise ValueError(f"Unknown block {block_hash}")
+        return self.nodes[block_hash]
+
+    def get_best_tip(self) -> BlockNode:
+        """Return the tip with the most cumulative work"""
+        return self.nodes[self.best_tip_hash]
+
+    def add_block(self, block: Any, work: int) -> BlockNode:
+        """Insert a block under its parent and update the best tip"""
+        if block.hash in self.nodes:
+            raise ValueError(f"Block {block.hash} already known")
+        if block.previous_hash not in self.nodes:
+            raise ValueError(f"Unknown parent block {block.previous_hash}")
+
+        parent = self.nodes[block.previous_hash]
+        node = BlockNode(
+            block=block,
+            parent_hash=parent.block.hash,
+            height=parent.height + 1,
+            cumulative_work=parent.cumulative_work + work
+        )
+        self.nodes[block.hash] = node
+        self.children[block.hash] = []
+        self.children[parent.block.hash].append(block.hash)
+        self.tips.discard(parent.block.hash)
+        self.tips.add(block.hash)
+
+        # Ties keep the first-seen tip so equal branches don't flip-flop
+        if node.cumulative_work > self.get_best_tip().cumulative_work:
+            self.best_tip_hash = block.hash
+
+        return node
+
+    def find_fork(self, old_tip_hash: str, new_tip_hash: str) -> Tuple[List[BlockNode], List[BlockNode]]:
+        """Return the blocks to disconnect (tip first) and to connect (ancestor first)"""
+        old_node = self.get_node(old_tip_hash)
+        new_node = self.get_node(new_tip_hash)
+        disconnect: List[BlockNode] = []
+        connect: List[BlockNode] = []
+
+        # Walk the deeper side back first, then both sides in lockstep
+        # until they meet; cost is bounded by the reorg depth
+        while old_node.height > new_node.height:
+            disconnect.append(old_node)
+            old_node = self.nodes[old_node.parent_hash]
+        while new_node.height > old_node.height:
+            connect.append(new_node)
+            new_node = self.nodes[new_node.parent_hash]
+        while old_node.block.hash != new_node.block.hash:
+            disconnect.append(old_node)
+            connect.append(new_node)
+            old_node = self.nodes[old_node.parent_hash]
+            new_node = self.nodes[new_node.parent_hash]
+
+        connect.reverse()
+        return disconnect, connect
+
+    def set_root(self, new_root_hash: str) -> int:
+        """Forget every block that is not a descendant of new_root_hash; returns the number removed"""
+        node = self.get_node(new_root_hash)
+        removed = 0
+        while node.parent_hash is not None:
+            parent_hash = node.parent_hash
+            stack = [h for h in self.children.pop(parent_hash) if h != node.block.hash]
+            while stack:
+                block_hash = stack.pop()
+                stack.extend(self.children.pop(block_hash))
+                del self.nodes[block_hash]
+                self.tips.discard(block_hash)
+                removed += 1
+            node.parent_hash = None
+            node = self.nodes.pop(parent_hash)
+            removed += 1
+
+        self.genesis_hash = new_root_hash
+        return removed
@@ -1,28 +1,98 @@
 # Step 1: Basic Blockchain Implementation
 import hashlib
+import threading
 import time
 import json
-from typing import List, Dict
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, List, Dict, Optional, Tuple
+
+from .atlys_blocktree import BlockTree, BlockNode, BlockUndo
+from .atlys_index import Location, TransactionIndex
+from .atlys_merkle import MerkleProof, build_merkle_proof, compute_merkle_root, hash_transaction
+from .atlys_snapshot import StateSnapshot, load_latest_snapshot, write_snapshot
+
+GENESIS_TIMESTAMP = 0.0
+
+@dataclass
+class BlockHeader:
+    """Block fields covered by the block hash; transactions are committed via the Merkle root."""
+    index: int
+    timestamp: float
+    merkle_root: str
+    previous_hash: str
+    nonce: int
+
+    def calculate_hash(self) -> str:
+        """Calculate block hash from the header alone."""
+        header_string = json.dumps({
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "merkle_root": self.merkle_root,
+            "previous_hash": self.previous_hash,
+            "nonce": self.nonce
+        }, sort_keys=True)
+        return hashlib.sha256(header_string.encode()).hexdigest()
+
+    def nonce_hashing_state(self) -> Tuple[Any, bytes]:
+        """Split the hashed header at the nonce: a hasher fed everything before it, and the bytes after it."""
+        header_string = json.dumps({
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "merkle_root": self.merkle_root,
+            "previous_hash": self.previous_hash,
+            "nonce": 0
+        }, sort_keys=True)
+        prefix, suffix = header_string.split('"nonce": 0', 1)
+        return hashlib.sha256((prefix + '"nonce": ').encode()), suffix.encode()
 
 class Block:
     def __init__(self, index: int, transactions: List[Dict], previous_hash: str):
         self.index = index
         self.timestamp = time.time()
         self.transactions = transactions
+        self.merkle_root = compute_merkle_root(self.get_transaction_hashes())
         self.previous_hash = previous_hash
         self.nonce = 0
         self.hash = self.calculate_hash()
 
+    @classmethod
+    def from_header(cls, header: BlockHeader) -> 'Block':
+        """Rebuild a block whose transaction body has been pruned."""
+        block = cls.__new__(cls)
+        block.index = header.index
+        block.timestamp = header.timestamp
+        block.transactions = None
+        block.merkle_root = header.merkle_root
+        block.previous_hash = header.previous_hash
+        block.nonce = header.nonce
+        block.hash = block.calculate_hash()
+        return block
+
+    def get_header(self) -> BlockHeader:
+        """Return the header that light clients store and verify."""
+        return BlockHeader(
+            index=self.index,
+            timestamp=self.timestamp,
+            merkle_root=self.merkle_root,
+            previous_hash=self.previous_hash,
+            nonce=self.nonce
+        )
+
     def calculate_hash(self) -> str:
         """Calculate block hash using all block properties."""
-        block_string = json.dumps({
-            "index": self.index,
-            "timestamp": self.timestamp,
-            "transactions": self.transactions,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        return self.get_header().calculate_hash()
+
+    def get_transaction_hashes(self) -> List[str]:
+        """Return the Merkle leaf hash of every transaction in the block."""
+        return [hash_transaction(tx) for tx in self.transactions]
+
+    def get_merkle_proof(self, position: int) -> Tuple[str, MerkleProof]:
+        """Return a transaction's hash and the proof linking it to the Merkle root."""
+        if self.transactions is None:
+            raise ValueError(f"Body of block {self.index} has been pruned")
+        leaves = self.get_transaction_hashes()
+        return leaves[position], build_merkle_proof(leaves, position)
 
     def mine_block(self, difficulty: int) -> None:
         """Mine block by finding nonce that produces hash with required difficulty."""
@@ -32,23 +102,58 @@ class Block:
         print(f"Block mined! Hash: {self.hash}")
 
 class Blockchain:
-    def __init__(self, difficulty: int = 4):
+    def __init__(
+        self,
+        difficulty: int = 4,
+        prune_depth: Optional[int] = None,
+        snapshot_interval: int = 100,
+        snapshot_dir: Optional[str] = None,
+        snapshot: Optional[StateSnapshot] = None
+    ):
         self.chain: List[Block] = []
         self.difficulty = difficulty
         self.pending_transactions: List[Dict] = []
         self.mining_reward = 10
-        self.create_genesis_block()
+        self.balances: Dict[str, float] = {}
+        self.tx_index = TransactionIndex()
+
+        # Pruning keeps headers for every block but drops bodies and undo
+        # data more than prune_depth blocks below the tip
+        self.prune_depth = prune_depth
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_dir = snapshot_dir
+        self.base_height = 0
+        self.pruned_height = 0
+
+        if snapshot is not None:
+            self.restore_snapshot(snapshot)
+        else:
+            self.create_genesis_block()
+
+    @classmethod
+    def from_snapshot_dir(cls, snapshot_dir: str, **kwargs) -> 'Blockchain':
+        """Start from the newest snapshot in snapshot_dir, or from genesis if there is none."""
+        return cls(snapshot_dir=snapshot_dir, snapshot=load_latest_snapshot(snapshot_dir), **kwargs)
 
     def create_genesis_block(self) -> None:
         """Create the first block in the chain."""
+        # The genesis block is the trust root rather than proof of work, so it
+        # is fixed instead of mined; every node then shares the same genesis
+        # and startup does not pay for a full mining round
         genesis_block = Block(0, [], "0")
-        genesis_block.mine_block(self.difficulty)
+        genesis_block.timestamp = GENESIS_TIMESTAMP
+        genesis_block.hash = genesis_block.calculate_hash()
         self.chain.append(genesis_block)
+        self.block_tree = BlockTree(genesis_block, self.get_block_work(genesis_block))
 
     def get_latest_block(self) -> Block:
         """Return the most recent block in the chain."""
         return self.chain[-1]
 
+    def get_block_work(self, block: Block) -> int:
+        """Expected number of hashes needed to mine a block at this difficulty."""
+        return 16 ** self.difficulty
+
     def add_transaction(self, sender: str, recipient: str, amount: float) -> None:
         """Add a new transaction to pending transactions."""
         self.pending_transactions.append({
@@ -59,36 +164,181 @@ class Blockchain:
 
     def mine_pending_transactions(self, miner_reward_address: str) -> None:
         """Create a new block with pending transactions and mine it."""
-        # Add mining reward transaction
-        self.pending_transactions.append({
-            "sender": "network",
-            "recipient": miner_reward_address,
-            "amount": self.mining_reward
-        })
-
-        # Create and mine new block
-        block = Block(
-            len(self.chain),
-            self.pending_transactions,
-            self.get_latest_block().hash
-        )
-        block.mine_block(self.difficulty)
-        
-        # Add block to chain and clear pending transactions
-        self.chain.append(block)
-        self.pending_transactions = []
+        Miner(self, miner_reward_address).mine_block()
         print(f"Block mined and added to chain! Length: {len(self.chain)}")
 
+    def add_block(self, block: Block) -> bool:
+        """Add a mined block on any known branch, switching to it if it becomes the heaviest."""
+        if block.hash != block.calculate_hash():
+            raise ValueError("Invalid block hash")
+        if block.hash[:self.difficulty] != "0" * self.difficulty:
+            raise ValueError("Block does not meet difficulty target")
+        if block.merkle_root != compute_merkle_root(block.get_transaction_hashes()):
+            raise ValueError("Merkle root does not match block transactions")
+
+        parent = self.block_tree.get_node(block.previous_hash)
+        if block.index != parent.height + 1:
+            raise ValueError(f"Block index {block.index} does not match height {parent.height + 1}")
+
+        previous_tip = self.block_tree.best_tip_hash
+        node = self.block_tree.add_block(block, self.get_block_work(block))
+
+        if self.block_tree.best_tip_hash == previous_tip:
+            return False
+
+        disconnect, connect = self.block_tree.find_fork(previous_tip, node.block.hash)
+        for old_node in disconnect:
+            self._disconnect_block(old_node)
+        for new_node in connect:
+            self._connect_block(new_node)
+        if disconnect:
+            print(f"Reorganized {len(disconnect)} block(s) onto heavier branch")
+
+        tip_height = self.get_latest_block().index
+        if self.snapshot_dir is not None and tip_height % self.snapshot_interval == 0:
+            self.save_snapshot()
+        if self.prune_depth is not None:
+            self.prune_blocks(tip_height - self.prune_depth)
+        return True
+
+    def _connect_block(self, node: BlockNode) -> None:
+        """Apply a block's transactions to the balances, recording how to undo them."""
+        undo = BlockUndo()
+        for transaction in node.block.transactions:
+            for address in (transaction["sender"], transaction["recipient"]):
+                if address not in undo.previous_balances:
+                    undo.previous_balances[address] = self.balances.get(address)
+            self.balances[transaction["sender"]] = (
+                self.balances.get(transaction["sender"], 0) - transaction["amount"]
+            )
+            self.balances[transaction["recipient"]] = (
+                self.balances.get(transaction["recipient"], 0) + transaction["amount"]
+            )
+        node.undo = undo
+        self.chain.append(node.block)
+        tx_hashes = node.block.get_transaction_hashes()
+        self.tx_index.add_block(node.height, node.block.transactions, tx_hashes)
+
+        # Whether the block was mined here or arrived from a peer, its
+        # transactions must not be mined again
+        included = Counter(tx_hashes)
+        remaining = []
+        for transaction in self.pending_transactions:
+            tx_hash = hash_transaction(transaction)
+            if included[tx_hash] > 0:
+                included[tx_hash] -= 1
+            else:
+                remaining.append(transaction)
+        self.pending_transactions = remaining
+
+    def _disconnect_block(self, node: BlockNode) -> None:
+        """Roll the balances back to before the active tip block."""
+        for address, balance in node.undo.previous_balances.items():
+            if balance is None:
+                self.balances.pop(address, None)
+            else:
+                self.balances[address] = balance
+        node.undo = None
+        self.chain.pop()
+        self.tx_index.remove_block(node.height, node.block.transactions, node.block.get_transaction_hashes())
+
+        # Return the block's transactions to the mempool, ahead of newer ones;
+        # any the new branch also includes are dropped again as it connects
+        requeued = [tx for tx in node.block.transactions if tx["sender"] != "network"]
+        self.pending_transactions = requeued + self.pending_transactions
+
     def get_balance(self, address: str) -> float:
         """Calculate balance for a given address."""
-        balance = 0
-        for block in self.chain:
-            for transaction in block.transactions:
-                if transaction["sender"] == address:
-                    balance -= transaction["amount"]
-                if transaction["recipient"] == address:
-                    balance += transaction["amount"]
-        return balance
+        return self.balances.get(address, 0)
+
+    def find_transaction(self, tx_hash: str) -> Optional[Location]:
+        """Return (block height, position) of a transaction on the active chain."""
+        return self.tx_index.find(tx_hash)
+
+    def get_transaction(self, tx_hash: str) -> Optional[Dict]:
+        """Return a transaction on the active chain by hash."""
+        location = self.tx_index.find(tx_hash)
+        if location is None:
+            return None
+        block = self.get_block(location[0])
+        if block.transactions is None:
+            raise ValueError(f"Body of block {block.index} has been pruned")
+        return block.transactions[location[1]]
+
+    def get_address_history(
+        self,
+        address: str,
+        cursor: Optional[Location] = None,
+        limit: int = 50
+    ) -> Tuple[List[Location], Optional[Location]]:
+        """Page through the transaction locations touching an address."""
+        return self.tx_index.get_history(address, cursor, limit)
+
+    def get_block(self, height: int) -> Block:
+        """Return the active-chain block at a height."""
+        if not self.base_height <= height <= self.get_latest_block().index:
+            raise ValueError(f"No block at height {height}")
+        return self.chain[height - self.base_height]
+
+    def get_balances_at(self, height: int) -> Dict[str, float]:
+        """Rebuild the balances as of an unpruned height by undoing the blocks above it."""
+        if not self.pruned_height <= height <= self.get_latest_block().index:
+            raise ValueError(f"State at height {height} is not available")
+
+        balances = dict(self.balances)
+        for h in range(self.get_latest_block().index, height, -1):
+            undo = self.block_tree.get_node(self.get_block(h).hash).undo
+            for address, balance in undo.previous_balances.items():
+                if balance is None:
+                    balances.pop(address, None)
+                else:
+                    balances[address] = balance
+        return balances
+
+    def create_snapshot(self, height: int) -> StateSnapshot:
+        """Capture the account state at a height."""
+        block = self.get_block(height)
+        return StateSnapshot(
+            height=height,
+            header=vars(block.get_header()),
+            cumulative_work=self.block_tree.get_node(block.hash).cumulative_work,
+            balances=self.get_balances_at(height)
+        )
+
+    def save_snapshot(self) -> str:
+        """Write a snapshot at the deepest height that pruning will still keep state for."""
+        if self.snapshot_dir is None:
+            raise ValueError("No snapshot directory configured")
+        height = max(self.pruned_height, self.get_latest_block().index - (self.prune_depth or 0))
+        return write_snapshot(self.snapshot_dir, self.create_snapshot(height))
+
+    def restore_snapshot(self, snapshot: StateSnapshot) -> None:
+        """Reset the chain to a snapshot block; later blocks are then added with add_block."""
+        block = Block.from_header(BlockHeader(**snapshot.header))
+        self.chain = [block]
+        self.balances = dict(snapshot.balances)
+        self.base_height = snapshot.height
+        self.pruned_height = snapshot.height
+        self.block_tree = BlockTree(block, snapshot.cumulative_work, snapshot.height)
+
+    def prune_blocks(self, height: int) -> None:
+        """Drop transaction bodies at and below a height, keeping their headers."""
+        height = min(height, self.get_latest_block().index)
+        if height <= self.pruned_height:
+            return
+
+        for h in range(self.pruned_height + 1, height + 1):
+            block = self.get_block(h)
+            # Pruned transactions can no longer be served, so they leave the index too
+            self.tx_index.prune_block(h, block.transactions, block.get_transaction_hashes())
+            block.transactions = None
+
+        # Blocks below the new root can no longer be reorganized away, so
+        # competing branches under it are dropped with their undo data
+        root_hash = self.get_block(height).hash
+        self.block_tree.set_root(root_hash)
+        self.block_tree.get_node(root_hash).undo = None
+        self.pruned_height = height
 
     def is_chain_valid(self) -> bool:
         """Verify the integrity of the blockchain."""
@@ -101,6 +351,11 @@ class Blockchain:
                 print("Current hash invalid")
                 return False
 
+            # Verify the header commits to the block's transactions
+            if current_block.transactions is not None and current_block.merkle_root != compute_merkle_root(current_block.get_transaction_hashes()):
+                print("Merkle root invalid")
+                return False
+
             # Verify chain linkage
             if current_block.previous_hash != previous_block.hash:
                 print("Previous hash link invalid")
@@ -108,6 +363,131 @@ class Blockchain:
 
         return True
 
+@dataclass
+class MiningStats:
+    """Counters kept by a Miner across blocks."""
+    hashes: int = 0
+    blocks_found: int = 0
+    template_refreshes: int = 0
+    aborted: int = 0
+    # Blocks found on a template whose parent stopped being the tip just before
+    stale_blocks: int = 0
+    # Hashes spent on templates abandoned because the tip moved or mining was cancelled
+    wasted_hashes: int = 0
+
+class BlockTemplate:
+    """Candidate block whose transactions can be topped up from the mempool while it is mined."""
+    def __init__(self, index: int, previous_hash: str, reward_transaction: Dict):
+        self.index = index
+        self.previous_hash = previous_hash
+        self.timestamp = time.time()
+        self.reward_transaction = reward_transaction
+        self.transactions: List[Dict] = []
+        self.leaf_hashes: List[str] = []
+        self.mempool_count = 0
+        self.hashes = 0
+        self.refresh([])
+
+    def refresh(self, mempool: List[Dict]) -> int:
+        """Pull in transactions added to the mempool since the last refresh; returns how many."""
+        # Mempools only grow between blocks, so only the new tail is hashed
+        added = mempool[self.mempool_count:]
+        self.transactions.extend(added)
+        self.leaf_hashes.extend(hash_transaction(tx) for tx in added)
+        self.mempool_count += len(added)
+
+        header = BlockHeader(
+            index=self.index,
+            timestamp=self.timestamp,
+            merkle_root=compute_merkle_root(self.leaf_hashes + [hash_transaction(self.reward_transaction)]),
+            previous_hash=self.previous_hash,
+            nonce=0
+        )
+        self._hasher, self._suffix = header.nonce_hashing_state()
+        return len(added)
+
+    def hash_nonce(self, nonce: int) -> str:
+        hasher = self._hasher.copy()
+        hasher.update(str(nonce).encode() + self._suffix)
+        return hasher.hexdigest()
+
+    def to_block(self, nonce: int) -> Block:
+        block = Block(self.index, self.transactions + [self.reward_transaction], self.previous_hash)
+        block.timestamp = self.timestamp
+        block.nonce = nonce
+        block.hash = block.calculate_hash()
+        return block
+
+class Miner:
+    """Mines on a live block template and gives up as soon as the chain tip moves."""
+    def __init__(
+        self,
+        blockchain: Blockchain,
+        miner_address: str,
+        refresh_interval: float = 1.0,
+        check_every: int = 1024
+    ):
+        self.blockchain = blockchain
+        self.miner_address = miner_address
+        self.refresh_interval = refresh_interval
+        # Hashes between checks for a new tip, cancellation or a refresh;
+        # at typical hash rates this bounds the abort delay to a few ms
+        self.check_every = check_every
+        self.stats = MiningStats()
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop the current mine_block call at its next check."""
+        self._cancelled.set()
+
+    def mine_block(self) -> Optional[Block]:
+        """Mine one block on the current tip; returns None if the tip moved or mining was cancelled."""
+        chain = self.blockchain
+        self._cancelled.clear()
+        tip = chain.get_latest_block()
+        template = BlockTemplate(tip.index + 1, tip.hash, {
+            "sender": "network",
+            "recipient": self.miner_address,
+            "amount": chain.mining_reward
+        })
+        template.refresh(chain.pending_transactions)
+        target = "0" * chain.difficulty
+        next_refresh = time.monotonic() + self.refresh_interval
+
+        nonce = 0
+        while True:
+            for nonce in range(nonce, nonce + self.check_every):
+                if template.hash_nonce(nonce).startswith(target):
+                    return self._submit(template, nonce)
+                template.hashes += 1
+                self.stats.hashes += 1
+            nonce += 1
+
+            if self._cancelled.is_set() or chain.get_latest_block().hash != template.previous_hash:
+                self.stats.aborted += 1
+                self.stats.wasted_hashes += template.hashes
+                return None
+
+            # Keep counting nonces after a refresh; the new Merkle root
+            # already makes them fresh work
+            if time.monotonic() >= next_refresh:
+                if template.refresh(chain.pending_transactions):
+                    self.stats.template_refreshes += 1
+                next_refresh = time.monotonic() + self.refresh_interval
+
+    def _submit(self, template: BlockTemplate, nonce: int) -> Optional[Block]:
+        template.hashes += 1
+        self.stats.hashes += 1
+        block = template.to_block(nonce)
+        # Connecting the block removes its transactions from the mempool; a
+        # block that lands on a side branch leaves them queued
+        if not self.blockchain.add_block(block):
+            self.stats.stale_blocks += 1
+            self.stats.wasted_hashes += template.hashes
+            return None
+        self.stats.blocks_found += 1
+        return block
+
 # Example usage
 def main():
     # Create blockchain
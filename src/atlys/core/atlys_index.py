@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+# Locations are packed as (height << POSITION_BITS) | position so that each
+# index entry is a machine integer and history arrays sort by chain order
+POSITION_BITS = 20
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+Location = Tuple[int, int]
+
+
+def pack_location(height: int, position: int) -> int:
+    if position > POSITION_MASK:
+        raise ValueError(f"Transaction position {position} exceeds index limit")
+    return (height << POSITION_BITS) | position
+
+
+def unpack_location(packed: int) -> Location:
+    return packed >> POSITION_BITS, packed & POSITION_MASK
+
+
+def _append(entries: Dict[str, array], key: str, location: int) -> None:
+    if key not in entries:
+        entries[key] = array("q")
+    entries[key].append(location)
+
+
+def _trim_from(entries: Dict[str, array], key: str, first_location: int) -> None:
+    """Drop a key's locations at or after first_location, which are at the end"""
+    locations = entries.get(key)
+    if locations is None:
+        return
+    while locations and locations[-1] >= first_location:
+        locations.pop()
+    if not locations:
+        del entries[key]
+
+
+def _trim_through(entries: Dict[str, array], key: str, last_location: int) -> None:
+    """Drop a key's locations up to and including last_location, which are at the front"""
+    locations = entries.get(key)
+    if locations is None:
+        return
+    del locations[:bisect_right(locations, last_location)]
+    if not locations:
+        del entries[key]
+
+
+class TransactionIndex:
+    """Transaction hash and per-address history indexes for the active chain"""
+    def __init__(self):
+        # Identical transactions share a hash (mining rewards to one miner,
+        # repeated equal transfers), so each hash keeps all of its locations
+        self.locations: Dict[str, array] = {}
+        self.address_history: Dict[str, array] = {}
+
+    def add_block(self, height: int, transactions: List[Dict], tx_hashes: List[str]) -> None:
+        """Index every transaction of a block appended to the active chain"""
+        for position, (transaction, tx_hash) in enumerate(zip(transactions, tx_hashes)):
+            location = pack_location(height, position)
+            _append(self.locations, tx_hash, location)
+            for address in {transaction["sender"], transaction["recipient"]}:
+                _append(self.address_history, address, location)
+
+    def remove_block(self, height: int, transactions: List[Dict], tx_hashes: List[str]) -> None:
+        """Drop the entries of the tip block removed from the active chain"""
+        # Blocks leave from the tip, so their entries are at the end
+        first_location = pack_location(height, 0)
+        for tx_hash in tx_hashes:
+            _trim_from(self.locations, tx_hash, first_location)
+        for transaction in transactions:
+            for address in {transaction["sender"], transaction["recipient"]}:
+                _trim_from(self.address_history, address, first_location)
+
+    def prune_block(self, height: int, transactions: List[Dict], tx_hashes: List[str]) -> None:
+        """Drop the entries of a block whose body is being pruned"""
+        # Pruning works up from the oldest block, so its entries are at the front
+        last_location = pack_location(height, POSITION_MASK)
+        for tx_hash in tx_hashes:
+            _trim_through(self.locations, tx_hash, last_location)
+        for transaction in transactions:
+            for address in {transaction["sender"], transaction["recipient"]}:
+                _trim_through(self.address_history, address, last_location)
+
+    def find(self, tx_hash: str) -> Optional[Location]:
+        """Return (block height, position) of the most recent occurrence of a transaction"""
+        locations = self.locations.get(tx_hash)
+        return None if not locations else unpack_location(locations[-1])
+
+    def find_all(self, tx_hash: str) -> List[Location]:
+        """Return every (block height, position) holding a transaction, oldest first"""
+        return [unpack_location(location) for location in self.locations.get(tx_hash, ())]
+
+    def get_history(
+        self,
+        address: str,
+        cursor: Optional[Location] = None,
+        limit: int = 50
+    ) -> Tuple[List[Location], Optional[Location]]:
+        """Page through an address's transactions oldest first, resuming after cursor"""
+        history = self.address_history.get(address)
+        if not history:
+            return [], None
+        start = 0 if cursor is None else bisect_right(history, pack_location(*cursor))
+        page = [unpack_location(location) for location in history[start:start + limit]]
+        next_cursor = page[-1] if page and start + limit < len(history) else None
+        return page, next_cursor
+
+
+class TransferIndex:
+    """Hash and chain-pair indexes over bridge transfers"""
+    def __init__(self):
+        self.transfers: Dict[str, Any] = {}
+        self.by_chain_pair: Dict[Tuple[str, str], List[str]] = {}
+        # Entries evicted from the front of each pair list, so cursors stay
+        # absolute positions after old transfers are archived
+        self.evicted: Dict[Tuple[str, str], int] = {}
+
+    def add(self, transaction: Any) -> None:
+        """Index a transfer by hash and by its (source, destination) chains"""
+        if transaction.tx_hash in self.transfers:
+            return
+        self.transfers[transaction.tx_hash] = transaction
+        pair = (transaction.source_chain, transaction.destination_chain)
+        self.by_chain_pair.setdefault(pair, []).append(transaction.tx_hash)
+
+    def evict(self, tx_hashes: List[str]) -> None:
+        """Forget the oldest transfers, given in completion order"""
+        counts: Dict[Tuple[str, str], int] = {}
+        for tx_hash in tx_hashes:
+            transaction = self.transfers.pop(tx_hash, None)
+            if transaction is not None:
+                pair = (transaction.source_chain, transaction.destination_chain)
+                counts[pair] = counts.get(pair, 0) + 1
+        for pair, count in counts.items():
+            del self.by_chain_pair[pair][:count]
+            self.evicted[pair] = self.evicted.get(pair, 0) + count
+
+    def get(self, tx_hash: str) -> Optional[Any]:
+        """Return an indexed transfer by hash"""
+        return self.transfers.get(tx_hash)
+
+    def get_chain_pair(
+        self,
+        source_chain: str,
+        destination_chain: str,
+        cursor: Optional[int] = None,
+        limit: int = 50
+    ) -> Tuple[List[Any], Optional[int]]:
+        """Page through in-memory transfers between two chains in completion order"""
+        pair = (source_chain, destination_chain)
+        tx_hashes = self.by_chain_pair.get(pair, [])
+        evicted = self.evicted.get(pair, 0)
+        start = max(cursor or 0, evicted) - evicted
+        page = [self.transfers[tx_hash] for tx_hash in tx_hashes[start:start + limit]]
+        next_cursor = evicted + start + limit if start + limit < len(tx_hashes) else None
+        return page, next_cursor
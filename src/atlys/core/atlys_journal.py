@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+JOURNAL_PREFIX = "journal-"
+JOURNAL_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoint.json"
+ARCHIVE_DIR = "archive"
+# Statuses after which a transfer leaves the pending set
+FINAL_STATUSES = ("completed", "failed")
+
+
+@dataclass
+class JournalState:
+    """Bridge state rebuilt from a checkpoint plus the journal records after it"""
+    seq: int = 0
+    pending: Dict[str, Dict] = field(default_factory=dict)
+    completed: List[Dict] = field(default_factory=list)
+    sender_nonces: Dict[str, int] = field(default_factory=dict)
+    next_segment: int = 0
+
+    def apply(self, record: Dict) -> None:
+        """Apply one journal record"""
+        self.seq = record["seq"]
+        if record["op"] == "transfer":
+            transfer = record["transfer"]
+            sender = transfer["sender"]
+            self.sender_nonces[sender] = max(self.sender_nonces.get(sender, 0), transfer["nonce"] + 1)
+            if transfer["status"] == "validated":
+                self.pending[transfer["tx_hash"]] = transfer
+        elif record["op"] == "status":
+            transfer = self.pending.get(record["tx_hash"])
+            if transfer is None:
+                return
+            transfer["status"] = record["status"]
+            transfer.update(record.get("fields", {}))
+            if record["status"] in FINAL_STATUSES:
+                del self.pending[record["tx_hash"]]
+                if record["status"] == "completed":
+                    self.completed.append(transfer)
+
+
+def _fsync_write(path: str, data: Any) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class BridgeJournal:
+    """Write-ahead journal of bridge transfer status transitions with group commit"""
+    def __init__(
+        self,
+        directory: str,
+        group_commit_size: int = 256,
+        group_commit_interval: float = 0.01,
+        checkpoint_every: int = 10_000,
+        max_completed_in_memory: int = 10_000,
+        segment_size: int = 5_000
+    ):
+        self.directory = directory
+        self.archive_directory = os.path.join(directory, ARCHIVE_DIR)
+        os.makedirs(self.archive_directory, exist_ok=True)
+
+        # Records are buffered and fsynced together once group_commit_size
+        # records or group_commit_interval seconds have accumulated
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.checkpoint_every = checkpoint_every
+        self.max_completed_in_memory = max_completed_in_memory
+        self.segment_size = segment_size
+
+        self.state = self._recover()
+        # Sorted 64-bit hash prefixes of archived transfers, each paired with
+        # (segment << 32) | byte offset of its line: 16 bytes per transfer
+        self._archive_keys = np.zeros(0, dtype=np.uint64)
+        self._archive_locations = np.zeros(0, dtype=np.uint64)
+        for segment in range(self.state.next_segment):
+            self._index_segment(segment, self._load_segment_index(segment))
+        self.durable_seq = self.state.seq
+        self.checkpoint_seq = self.state.seq
+        self.fsyncs = 0
+        self._buffer: List[str] = []
+        self._buffer_started = 0.0
+        # Any file already at this name can only hold a torn record
+        self._file = open(self._journal_path(self.state.seq + 1), "w")
+
+    def _journal_path(self, start_seq: int) -> str:
+        return os.path.join(self.directory, f"{JOURNAL_PREFIX}{start_seq:012d}{JOURNAL_SUFFIX}")
+
+    def _journal_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX)
+        )
+
+    def _read_records(self, path: str) -> Iterator[Dict]:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write was never committed
+                    return
+
+    def _recover(self) -> JournalState:
+        state = JournalState()
+        checkpoint_path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = JournalState(**json.load(f))
+        for path in self._journal_files():
+            for record in self._read_records(path):
+                if record["seq"] > state.seq:
+                    state.apply(record)
+        return state
+
+    def _append(self, record: Dict) -> None:
+        record["seq"] = self.state.seq + 1
+        self.state.apply(record)
+        if not self._buffer:
+            self._buffer_started = time.monotonic()
+        self._buffer.append(json.dumps(record, sort_keys=True) + "\n")
+        if (len(self._buffer) >= self.group_commit_size
+                or time.monotonic() - self._buffer_started >= self.group_commit_interval):
+            self.commit()
+
+    def record_transfer(self, transfer: Dict) -> None:
+        """Journal a new transfer together with its first status"""
+        self._append({"op": "transfer", "transfer": transfer})
+
+    def record_status(self, tx_hash: str, status: str, **fields: Any) -> None:
+        """Journal a later status transition of a transfer, with any fields it set"""
+        record = {"op": "status", "tx_hash": tx_hash, "status": status}
+        if fields:
+            record["fields"] = fields
+        self._append(record)
+
+    def commit(self) -> None:
+        """Write and fsync every buffered record in one go"""
+        if not self._buffer:
+            return
+        self._file.write("".join(self._buffer))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        self._buffer = []
+        self.durable_seq = self.state.seq
+        if self.durable_seq - self.checkpoint_seq >= self.checkpoint_every:
+            self.checkpoint()
+
+    def _segment_path(self, segment: int, suffix: str = ".jsonl") -> str:
+        return os.path.join(self.archive_directory, f"segment-{segment:08d}{suffix}")
+
+    def _load_segment_index(self, segment: int) -> np.ndarray:
+        # A segment counts as archived only once the checkpoint after its
+        # index file is written, so every segment below next_segment has one
+        return np.load(self._segment_path(segment, ".idx"))
+
+    def _index_segment(self, segment: int, entries: np.ndarray) -> None:
+        keys = np.concatenate([self._archive_keys, entries[:, 0]])
+        locations = np.concatenate([self._archive_locations, (np.uint64(segment) << np.uint64(32)) | entries[:, 1]])
+        order = np.argsort(keys, kind="stable")
+        self._archive_keys = keys[order]
+        self._archive_locations = locations[order]
+
+    def archive_overflow(self) -> List[str]:
+        """Move the oldest completed transfers to disk segments; returns their hashes"""
+        archived: List[str] = []
+        while len(self.state.completed) - self.segment_size >= self.max_completed_in_memory:
+            segment = self.state.completed[:self.segment_size]
+            lines = [json.dumps(transfer, sort_keys=True) + "\n" for transfer in segment]
+            offsets = np.cumsum([0] + [len(line.encode()) for line in lines[:-1]])
+            entries = np.array(
+                [(int(transfer["tx_hash"][:16], 16), offset) for transfer, offset in zip(segment, offsets)],
+                dtype=np.uint64
+            ).reshape(-1, 2)
+            _fsync_write(self._segment_path(self.state.next_segment), "".join(lines))
+            index_file = io.BytesIO()
+            np.save(index_file, entries)
+            _fsync_write(self._segment_path(self.state.next_segment, ".idx"), index_file.getvalue())
+            self._index_segment(self.state.next_segment, entries)
+            del self.state.completed[:self.segment_size]
+            self.state.next_segment += 1
+            archived.extend(transfer["tx_hash"] for transfer in segment)
+        if archived:
+            # The checkpoint is what makes the archived transfers leave the
+            # recovered in-memory set
+            self.checkpoint()
+        return archived
+
+    def find_archived(self, tx_hash: str) -> Optional[Dict]:
+        """Look up an archived transfer through the in-memory hash index, reading only its line"""
+        key = np.uint64(int(tx_hash[:16], 16))
+        position = int(np.searchsorted(self._archive_keys, key))
+        # Distinct hashes can share a prefix, so every match is checked
+        while position < len(self._archive_keys) and self._archive_keys[position] == key:
+            location = int(self._archive_locations[position])
+            transfer = self._read_archived(location >> 32, location & 0xFFFFFFFF)
+            if transfer["tx_hash"] == tx_hash:
+                return transfer
+            position += 1
+        return None
+
+    def _read_archived(self, segment: int, offset: int) -> Dict:
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def checkpoint(self) -> None:
+        """Write a compact snapshot of the state and drop the journal files it covers"""
+        self.commit()
+        state = self.state
+        _fsync_write(os.path.join(self.directory, CHECKPOINT_FILE), json.dumps({
+            "seq": state.seq,
+            "pending": state.pending,
+            "completed": state.completed,
+            "sender_nonces": state.sender_nonces,
+            "next_segment": state.next_segment
+        }))
+        self.checkpoint_seq = state.seq
+
+        self._file.close()
+        for path in self._journal_files():
+            os.remove(path)
+        self._file = open(self._journal_path(state.seq + 1), "w")
+
+    def close(self) -> None:
+        self.commit()
+        self._file.close()
@@ -0,0 +1,106 @@
+import struct
+from typing import Dict, List
+
+from .atlys_implementation import BlockHeader
+from .atlys_merkle import MerkleProof, hash_transaction, verify_merkle_proof
+
+# previous_hash, merkle_root, timestamp, nonce; the height is implied by position
+HEADER_FORMAT = struct.Struct("<32s32sdQ")
+
+
+class LightChainClient:
+    """Header-only view of a remote chain, trusted from a checkpoint block"""
+    def __init__(self, chain_id: str, checkpoint_hash: str, checkpoint_height: int = 0, difficulty: int = 4):
+        self.chain_id = chain_id
+        self.checkpoint_hash = checkpoint_hash
+        self.checkpoint_height = checkpoint_height
+        self.difficulty = difficulty
+        # Headers above the checkpoint packed back to back, HEADER_FORMAT.size bytes each
+        self.headers = bytearray()
+        self.tip_hash = checkpoint_hash
+
+    @property
+    def tip_height(self) -> int:
+        return self.checkpoint_height + len(self.headers) // HEADER_FORMAT.size
+
+    def get_header(self, height: int) -> BlockHeader:
+        """Unpack the stored header at a height above the checkpoint"""
+        if not self.checkpoint_height < height <= self.tip_height:
+            raise ValueError(f"No header stored at height {height} for {self.chain_id}")
+        offset = (height - self.checkpoint_height - 1) * HEADER_FORMAT.size
+        previous_hash, merkle_root, timestamp, nonce = HEADER_FORMAT.unpack_from(self.headers, offset)
+        return BlockHeader(
+            index=height,
+            timestamp=timestamp,
+            merkle_root=merkle_root.hex(),
+            previous_hash=previous_hash.hex(),
+            nonce=nonce
+        )
+
+    def get_block_hash(self, height: int) -> str:
+        """Hash of the block at a height, read from the child's link where possible"""
+        if height == self.checkpoint_height:
+            return self.checkpoint_hash
+        if height == self.tip_height:
+            return self.tip_hash
+        return self.get_header(height + 1).previous_hash
+
+    def add_headers(self, headers: List[BlockHeader]) -> bool:
+        """Verify and store a run of consecutive headers, switching branch if the run is longer"""
+        if not headers:
+            return False
+
+        start_height = headers[0].index
+        if not self.checkpoint_height < start_height <= self.tip_height + 1:
+            raise ValueError(f"Headers for {self.chain_id} do not connect at height {start_height}")
+
+        # Validate the whole run before touching stored state
+        previous_hash = self.get_block_hash(start_height - 1)
+        for offset, header in enumerate(headers):
+            if header.index != start_height + offset:
+                raise ValueError("Headers are not consecutive")
+            if header.previous_hash != previous_hash:
+                raise ValueError(f"Header {header.index} does not link to its parent")
+            header_hash = header.calculate_hash()
+            if header_hash[:self.difficulty] != "0" * self.difficulty:
+                raise ValueError(f"Header {header.index} does not meet difficulty target")
+            previous_hash = header_hash
+
+        # Every block has the same work at a fixed difficulty, so the
+        # heavier branch is simply the taller one
+        new_tip_height = start_height + len(headers) - 1
+        if new_tip_height <= self.tip_height:
+            return False
+
+        del self.headers[(start_height - self.checkpoint_height - 1) * HEADER_FORMAT.size:]
+        for header in headers:
+            self.headers += HEADER_FORMAT.pack(
+                bytes.fromhex(header.previous_hash),
+                bytes.fromhex(header.merkle_root),
+                header.timestamp,
+                header.nonce
+            )
+        self.tip_hash = previous_hash
+        return True
+
+    def verify_inclusion(
+        self,
+        transaction: Dict,
+        block_height: int,
+        proof: MerkleProof,
+        min_confirmations: int = 1
+    ) -> bool:
+        """Check a full node's Merkle proof that a transaction is in a stored block"""
+        if block_height + min_confirmations - 1 > self.tip_height:
+            return False
+        try:
+            header = self.get_header(block_height)
+        except ValueError:
+            return False
+        # The leaf is hashed here rather than taken from the full node, so a
+        # proof can only ever vouch for this exact transaction
+        return verify_merkle_proof(hash_transaction(transaction), proof, header.merkle_root)
+
+    def memory_usage(self) -> int:
+        """Bytes used by the stored headers"""
+        return len(self.headers)
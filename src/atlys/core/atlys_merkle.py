@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+# Each proof step is the sibling hash and whether it sits on the left
+MerkleProof = List[Tuple[str, bool]]
+
+EMPTY_ROOT = "0" * 64
+
+# Distinct prefixes for leaves and inner nodes, so an inner node can never
+# be passed off as a transaction
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_transaction(transaction: Dict) -> str:
+    """Leaf hash of a transaction"""
+    return hashlib.sha256(LEAF_PREFIX + json.dumps(transaction, sort_keys=True).encode()).hexdigest()
+
+
+def hash_pair(left: str, right: str) -> str:
+    """Hash two child nodes into their parent"""
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level: List[str]) -> List[str]:
+    parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    # An unpaired last node moves up unchanged; duplicating it would let two
+    # different transaction lists share a root
+    if len(level) % 2 == 1:
+        parents.append(level[-1])
+    return parents
+
+
+def compute_merkle_root(leaves: List[str]) -> str:
+    """Merkle root of a list of leaf hashes, promoting the last node on odd levels"""
+    if not leaves:
+        return EMPTY_ROOT
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def build_merkle_proof(leaves: List[str], position: int) -> MerkleProof:
+    """Sibling path proving the leaf at position is part of the root"""
+    if not 0 <= position < len(leaves):
+        raise ValueError(f"Leaf position {position} out of range")
+
+    proof: MerkleProof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = position ^ 1
+        # A promoted node has no sibling at this level
+        if sibling < len(level):
+            proof.append((level[sibling], sibling < position))
+        level = _next_level(level)
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf: str, proof: MerkleProof, merkle_root: str) -> bool:
+    """Check that a leaf hashes up to the given root along the proof"""
+    current = leaf
+    for sibling, sibling_on_left in proof:
+        current = hash_pair(sibling, current) if sibling_on_left else hash_pair(current, sibling)
+    return current == merkle_root
@@ -0,0 +1,195 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+MAX_REPUTATION = 100.0
+# Reputation change per vote at full time weight, as in ValidatorNode.update_reputation
+SUCCESS_REWARD = 1.0
+FAILURE_PENALTY = 5.0
+# Seconds after which a validator's vote carries full weight
+FULL_WEIGHT_INTERVAL = 3600.0
+COLUMNS = ("stake", "reputation", "last_validation_time", "validated_transactions", "slashed")
+
+
+@dataclass
+class EpochResult:
+    """What an epoch did to the validator set"""
+    decayed: int = 0
+    slashed: List[str] = field(default_factory=list)
+    slashed_stake: float = 0.0
+    rewards_paid: float = 0.0
+
+
+class ValidatorRegistry:
+    """Validator state stored column-wise, one NumPy array per field, indexed by slot"""
+    def __init__(self, capacity: int = 64):
+        self.size = 0
+        self.ids: List[str] = []
+        self.slots: Dict[str, int] = {}
+        self.stake = np.zeros(capacity, dtype=np.float64)
+        self.reputation = np.zeros(capacity, dtype=np.float64)
+        self.last_validation_time = np.zeros(capacity, dtype=np.float64)
+        self.validated_transactions = np.zeros(capacity, dtype=np.int64)
+        self.slashed = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        capacity = max(1, 2 * len(self.stake))
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def add(
+        self,
+        validator_id: str,
+        stake: float,
+        reputation: float = MAX_REPUTATION,
+        last_validation_time: float = 0.0,
+        validated_transactions: int = 0,
+        slashed: bool = False
+    ) -> int:
+        """Append a validator and return its slot"""
+        if validator_id in self.slots:
+            raise ValueError(f"Validator {validator_id} already registered")
+        if self.size == len(self.stake):
+            self._grow()
+
+        slot = self.size
+        self.stake[slot] = stake
+        self.reputation[slot] = reputation
+        self.last_validation_time[slot] = last_validation_time
+        self.validated_transactions[slot] = validated_transactions
+        self.slashed[slot] = slashed
+        self.ids.append(validator_id)
+        self.slots[validator_id] = slot
+        self.size += 1
+        return slot
+
+    def remove(self, validator_id: str) -> int:
+        """Delete a validator, shifting later slots down by one to keep registration order; returns its slot"""
+        slot = self.slots.pop(validator_id)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column[slot:self.size - 1] = column[slot + 1:self.size]
+        del self.ids[slot]
+        for moved_id in self.ids[slot:]:
+            self.slots[moved_id] -= 1
+        self.size -= 1
+        return slot
+
+    def copy_from(self, validator_id: str, other: 'ValidatorRegistry', other_slot: int) -> int:
+        """Add a validator with the state it has in another registry"""
+        return self.add(
+            validator_id,
+            other.stake[other_slot],
+            other.reputation[other_slot],
+            other.last_validation_time[other_slot],
+            other.validated_transactions[other_slot],
+            other.slashed[other_slot]
+        )
+
+    def active_mask(self) -> np.ndarray:
+        return ~self.slashed[:self.size]
+
+    def top_active(self, count: int) -> np.ndarray:
+        """Slots of the best unslashed validators by reputation, then stake, then registration order"""
+        active = np.flatnonzero(self.active_mask())
+        order = np.lexsort((active, -self.stake[active], -self.reputation[active]))
+        return active[order[:count]]
+
+    def selection_weights(self) -> np.ndarray:
+        """Stake weighted by reputation for every slot, zero for slashed validators"""
+        return np.where(
+            self.active_mask(),
+            self.stake[:self.size] * self.reputation[:self.size] / MAX_REPUTATION,
+            0.0
+        )
+
+    def sample_committees(self, count: int, size: int, rng: np.random.Generator) -> List[np.ndarray]:
+        """Draw count disjoint committees of size slots, each validator chosen with probability by weight"""
+        weights = self.selection_weights()
+        candidates = np.flatnonzero(weights > 0)
+        count = min(count, len(candidates) // size)
+        if count == 0:
+            return []
+        # Weighted sampling without replacement (Efraimidis-Spirakis): the
+        # largest keys u ** (1 / w) win, so ties in weight are broken at random
+        keys = rng.random(len(candidates)) ** (1.0 / weights[candidates])
+        drawn = candidates[np.argsort(-keys, kind="stable")[:count * size]]
+        # Deal the drawn slots round-robin so committees get similar stake
+        return [np.sort(drawn[i::count]) for i in range(count)]
+
+    def record_votes(self, slots: np.ndarray, successes: np.ndarray, now: float) -> None:
+        """Apply the per-vote reputation rule to many validators at once"""
+        time_factor = np.minimum(1.0, (now - self.last_validation_time[slots]) / FULL_WEIGHT_INTERVAL)
+        reputation = self.reputation[slots]
+        self.reputation[slots] = np.where(
+            successes,
+            np.minimum(MAX_REPUTATION, reputation + SUCCESS_REWARD * time_factor),
+            np.maximum(0.0, reputation - FAILURE_PENALTY * time_factor)
+        )
+        self.last_validation_time[slots] = now
+        self.validated_transactions[slots] += 1
+
+    def slash(self, slots: np.ndarray, stake_fraction: float = 0.5) -> float:
+        """Slash validators, burning a fraction of their stake; returns the stake removed"""
+        slots = slots[~self.slashed[slots]]
+        removed = self.stake[slots] * stake_fraction
+        self.stake[slots] -= removed
+        self.reputation[slots] = 0.0
+        self.slashed[slots] = True
+        return float(removed.sum())
+
+    def decay_reputation(self, now: float, idle_period: float, decay_rate: float, floor: float = 0.0) -> int:
+        """Shrink the reputation of active validators idle for idle_period, not below floor; returns how many decayed"""
+        reputation = self.reputation[:self.size]
+        idle = self.active_mask() & (now - self.last_validation_time[:self.size] >= idle_period) & (reputation > floor)
+        reputation[idle] = np.maximum(reputation[idle] * (1.0 - decay_rate), floor)
+        return int(idle.sum())
+
+    def distribute_rewards(self, amount: float) -> float:
+        """Add amount to active stakes in proportion to stake weighted by reputation"""
+        weights = self.selection_weights()
+        total_weight = weights.sum()
+        if amount <= 0 or total_weight <= 0:
+            return 0.0
+        self.stake[:self.size] += amount * weights / total_weight
+        return amount
+
+    def process_epoch(
+        self,
+        now: float,
+        reward: float = 0.0,
+        idle_period: float = FULL_WEIGHT_INTERVAL,
+        decay_rate: float = 0.05,
+        slash_threshold: float = 20.0,
+        slash_fraction: float = 0.5
+    ) -> EpochResult:
+        """Decay idle reputation, slash low-reputation validators and pay out rewards plus slashed stake"""
+        result = EpochResult()
+        # Validators may sit idle simply because they were never selected, so
+        # decay stops at the slashing threshold; only failed votes go below it
+        result.decayed = self.decay_reputation(now, idle_period, decay_rate, floor=slash_threshold)
+
+        to_slash = np.flatnonzero(self.active_mask() & (self.reputation[:self.size] < slash_threshold))
+        result.slashed = [self.ids[slot] for slot in to_slash]
+        result.slashed_stake = self.slash(to_slash, slash_fraction)
+
+        result.rewards_paid = self.distribute_rewards(reward + result.slashed_stake)
+        return result
+
+
+def column_property(column: str, cast: Callable[[Any], Any]) -> property:
+    """Expose one registry column as an attribute of a per-validator view"""
+    def getter(self) -> Any:
+        return cast(getattr(self.registry, column)[self.slot])
+
+    def setter(self, value: Any) -> None:
+        getattr(self.registry, column)[self.slot] = value
+
+    return property(getter, setter)
@@ -0,0 +1,61 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".json"
+
+
+@dataclass
+class StateSnapshot:
+    """Account balances as of one block, plus what is needed to resume the chain from it"""
+    height: int
+    header: Dict
+    cumulative_work: int
+    balances: Dict[str, float]
+
+
+def _snapshot_path(directory: str, height: int) -> str:
+    return os.path.join(directory, f"{SNAPSHOT_PREFIX}{height:012d}{SNAPSHOT_SUFFIX}")
+
+
+def list_snapshots(directory: str) -> List[str]:
+    """Snapshot files in a directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+    )
+
+
+def write_snapshot(directory: str, snapshot: StateSnapshot, keep: int = 2) -> str:
+    """Atomically write a snapshot and delete all but the newest `keep` files"""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, snapshot.height)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(asdict(snapshot), f, separators=(",", ":"), sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+    for old_path in list_snapshots(directory)[:-keep]:
+        os.remove(old_path)
+    return path
+
+
+def load_snapshot(path: str) -> StateSnapshot:
+    """Read a snapshot file"""
+    with open(path) as f:
+        return StateSnapshot(**json.load(f))
+
+
+def load_latest_snapshot(directory: str) -> Optional[StateSnapshot]:
+    """Read the newest snapshot in a directory, if any"""
+    snapshots = list_snapshots(directory)
+    if not snapshots:
+        return None
+    return load_snapshot(snapshots[-1])
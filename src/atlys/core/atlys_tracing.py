@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_NOT_SAMPLED = nullcontext()
+
+
+@dataclass
+class TransferTrace:
+    """Spans recorded for one sampled transfer"""
+    tx_hash: str
+    track: int
+    spans: List[Tuple[str, float, float]] = field(default_factory=list)
+    open_spans: Dict[str, float] = field(default_factory=dict)
+    status: str = "pending"
+
+    @property
+    def duration(self) -> float:
+        if not self.spans:
+            return 0.0
+        return max(end for _, _, end in self.spans) - min(start for _, start, _ in self.spans)
+
+    def to_events(self, pid: int = 1) -> List[Dict[str, Any]]:
+        """Chrome trace events: a track named after the transfer plus one complete event per span"""
+        events: List[Dict[str, Any]] = [{
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": self.track,
+            "args": {"name": f"tx {self.tx_hash[:16]}"}
+        }]
+        for name, start, end in self.spans:
+            events.append({
+                "name": name,
+                "cat": "transfer",
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": self.track,
+                "args": {"tx_hash": self.tx_hash, "status": self.status}
+            })
+        return events
+
+
+class _Span:
+    __slots__ = ("tracer", "trace", "name", "start")
+
+    def __init__(self, tracer: 'TransferTracer', trace: TransferTrace, name: str):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = self.tracer.clock()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.trace.spans.append((self.name, self.start, self.tracer.clock()))
+
+
+class TraceFileWriter:
+    """Appends trace events to a JSON array file, rotating it once it reaches max_bytes"""
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._open()
+
+    def _open(self) -> None:
+        # The Chrome/Perfetto JSON array format allows the closing bracket
+        # to be missing, so a file is valid at every point while it grows
+        self._file = open(self.path, "w")
+        self._file.write("[\n")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(event) + ",\n" for event in events))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class TransferTracer:
+    """Sampled per-transfer stage timings for the bridge"""
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        writer: Optional[TraceFileWriter] = None,
+        keep_slowest: int = 100,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.sample_rate = sample_rate
+        self.writer = writer
+        self.keep_slowest = keep_slowest
+        self.clock = clock
+        self.active: Dict[str, TransferTrace] = {}
+        self._slowest: List[Tuple[float, int, TransferTrace]] = []
+        self._tracks: Iterator[int] = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def set_sample_rate(self, sample_rate: float) -> None:
+        """Change the fraction of transfers traced; transfers already being traced continue"""
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Sample rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+
+    def is_sampled(self, tx_hash: str) -> bool:
+        # Deciding from the hash keeps the choice stable across stages
+        # and across nodes that see the same transfer
+        return int(tx_hash[:8], 16) < self.sample_rate * 0x100000000
+
+    def _trace(self, tx_hash: str) -> Optional[TransferTrace]:
+        trace = self.active.get(tx_hash)
+        if trace is None and self.sample_rate > 0 and self.is_sampled(tx_hash):
+            trace = TransferTrace(tx_hash, next(self._tracks))
+            self.active[tx_hash] = trace
+        return trace
+
+    def span(self, tx_hash: str, name: str) -> Any:
+        """Context manager timing one stage of a transfer"""
+        trace = self._trace(tx_hash)
+        if trace is None:
+            return _NOT_SAMPLED
+        return _Span(self, trace, name)
+
+    def begin(self, tx_hash: str, name: str) -> None:
+        """Open a stage that ends in a later call, such as the wait in the pending queue"""
+        # Reopening a stage, as when a transfer is retried, keeps its first start
+        trace = self._trace(tx_hash)
+        if trace is not None:
+            trace.open_spans.setdefault(name, self.clock())
+
+    def end(self, tx_hash: str, name: str) -> None:
+        trace = self.active.get(tx_hash)
+        if trace is not None and name in trace.open_spans:
+            trace.spans.append((name, trace.open_spans.pop(name), self.clock()))
+
+    def finish(self, tx_hash: str, status: str) -> None:
+        """Close out a transfer, write its spans and consider it for the slowest list"""
+        trace = self.active.pop(tx_hash, None)
+        if trace is None:
+            return
+        trace.status = status
+        with self._lock:
+            entry = (trace.duration, trace.track, trace)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+            if self.writer is not None:
+                self.writer.write(trace.to_events())
+
+    def slowest(self, count: int = 10) -> List[TransferTrace]:
+        """The slowest finished transfers seen so far, slowest first"""
+        with self._lock:
+            return [trace for _, _, trace in heapq.nlargest(count, self._slowest)]
+
+    def dump_slowest(self, path: str, count: int = 10) -> List[TransferTrace]:
+        """Write the slowest transfers to a standalone Chrome trace file"""
+        traces = self.slowest(count)
+        events = [event for trace in traces for event in trace.to_events()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return traces
@@ -0,0 +1,163 @@
+import argparse
+import importlib
+import json
+import signal
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class NodeConfig:
+    """Settings for a single node, read from a JSON file"""
+    chain_id: str = "atlys-1"
+    difficulty: int = 4
+    prune_depth: Optional[int] = None
+    snapshot_interval: int = 100
+    snapshot_dir: Optional[str] = None
+    miner_address: Optional[str] = None
+
+    # Optional subsystems; each one is only imported when enabled
+    wallet: bool = False
+    bridge: bool = False
+    smart_contracts: bool = False
+    networking: bool = False
+    host: str = "127.0.0.1"
+    port: int = 5000
+
+    # Transfer tracing, only used when the bridge is enabled
+    trace_path: Optional[str] = None
+    trace_sample_rate: float = 0.01
+    trace_dump_count: int = 20
+
+    @classmethod
+    def from_file(cls, path: str) -> 'NodeConfig':
+        """Load a config file, rejecting keys the node does not know"""
+        with open(path) as f:
+            values = json.load(f)
+        unknown = set(values) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+
+class StartupProfile:
+    """Wall-clock timings of the import and initialization steps of a node"""
+    def __init__(self):
+        self.steps: List[Tuple[str, float]] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def step(self, label: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((label, time.perf_counter() - start))
+
+    def report(self) -> str:
+        """Format the timings as a table in milliseconds"""
+        width = max([len(label) for label, _ in self.steps] + [len("total")])
+        lines = ["startup profile (ms)"]
+        for label, seconds in self.steps:
+            lines.append(f"  {label:<{width}}  {seconds * 1000:8.2f}")
+        lines.append(f"  {'total':<{width}}  {(time.perf_counter() - self.started) * 1000:8.2f}")
+        return "\n".join(lines)
+
+
+class Node:
+    """A node assembled from the subsystems its config enables"""
+    def __init__(self, config: NodeConfig, profile: Optional[StartupProfile] = None):
+        self.config = config
+        self.profile = profile or StartupProfile()
+        self.blockchain: Any = None
+        self.wallet: Any = None
+        self.bridge: Any = None
+        self.contract_vm: Any = None
+        self.app: Any = None
+
+    def _import(self, module_name: str) -> Any:
+        with self.profile.step(f"import {module_name}"):
+            return importlib.import_module(module_name)
+
+    def start(self) -> None:
+        """Import and initialize the chain and every enabled subsystem"""
+        config = self.config
+        core = self._import("atlys.core.atlys_implementation")
+        with self.profile.step("init chain"):
+            chain_options = {
+                "difficulty": config.difficulty,
+                "prune_depth": config.prune_depth,
+                "snapshot_interval": config.snapshot_interval
+            }
+            if config.snapshot_dir is not None:
+                self.blockchain = core.Blockchain.from_snapshot_dir(config.snapshot_dir, **chain_options)
+            else:
+                self.blockchain = core.Blockchain(**chain_options)
+
+        if config.wallet:
+            wallet_module = self._import("atlys.crypto.atlys_wallet")
+            with self.profile.step("init wallet"):
+                self.wallet = wallet_module.Wallet()
+
+        if config.bridge:
+            bridge_module = self._import("atlys.core.atlas_protocol")
+            with self.profile.step("init bridge"):
+                tracer = None
+                if config.trace_path is not None:
+                    tracing = importlib.import_module("atlys.core.atlys_tracing")
+                    tracer = tracing.TransferTracer(
+                        config.trace_sample_rate,
+                        tracing.TraceFileWriter(config.trace_path)
+                    )
+                self.bridge = bridge_module.EnhancedCrossChainBridge(tracer=tracer)
+                self.bridge.register_chain(config.chain_id, self.blockchain)
+                if tracer is not None and hasattr(signal, "SIGUSR1"):
+                    signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump_slowest_transfers())
+
+        if config.smart_contracts:
+            contract_module = self._import("atlys.smart_contracts.atlys_smartcontract")
+            self.contract_vm = contract_module.SmartContract
+
+        if config.networking:
+            networking_module = self._import("atlys.networking.atlys_networking")
+            with self.profile.step("init networking"):
+                self.app = networking_module.create_app(self.blockchain)
+
+    def dump_slowest_transfers(self) -> str:
+        """Write the slowest traced transfers next to the trace file; also bound to SIGUSR1"""
+        path = f"{self.config.trace_path}.slowest.json"
+        self.bridge.tracer.dump_slowest(path, self.config.trace_dump_count)
+        return path
+
+    def run(self, blocks: int = 0) -> None:
+        """Mine the requested number of blocks, then serve the API if networking is enabled"""
+        if blocks and self.config.miner_address is None:
+            raise ValueError("miner_address must be configured to mine blocks")
+        for _ in range(blocks):
+            self.blockchain.mine_pending_transactions(self.config.miner_address)
+        if self.app is not None:
+            self.app.run(host=self.config.host, port=self.config.port)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="atlys", description="Run an ATLYS node")
+    parser.add_argument("-c", "--config", help="path to a JSON node config file")
+    parser.add_argument("--mine", type=int, default=0, metavar="BLOCKS", help="mine this many blocks before serving")
+    parser.add_argument("--profile-startup", action="store_true", help="print import and init timings")
+    args = parser.parse_args(argv)
+
+    profile = StartupProfile()
+    with profile.step("load config"):
+        config = NodeConfig.from_file(args.config) if args.config else NodeConfig()
+
+    node = Node(config, profile)
+    node.start()
+    if args.profile_startup:
+        print(profile.report())
+    node.run(args.mine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import hashlib
+import hmac
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional
+
+from ..core.atlas_protocol import CrossChainTransaction, EnhancedCrossChainBridge, ValidatorNode
+from ..core.atlys_implementation import Block, Blockchain
+
+
+class VirtualClock:
+    """Simulated time source; only moves when the simulator advances it"""
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_to(self, timestamp: float) -> None:
+        if timestamp < self.now:
+            raise ValueError(f"Cannot move clock back from {self.now} to {timestamp}")
+        self.now = timestamp
+
+
+class SimulatedSigner:
+    """Deterministic HMAC signer standing in for the bridge's RSA key"""
+    def __init__(self, key: bytes):
+        self.key = key
+
+    def sign(self, message: bytes) -> bytes:
+        return hmac.new(self.key, message, hashlib.sha256).digest()
+
+    def verify(self, signature: bytes, message: bytes) -> bool:
+        return signature is not None and hmac.compare_digest(signature, self.sign(message))
+
+
+class MaliciousValidator(ValidatorNode):
+    """Validator that votes against every transaction"""
+    def validate_transaction(self, transaction: CrossChainTransaction) -> bool:
+        return False
+
+
+@dataclass
+class SimulationConfig:
+    seed: int = 0
+    chains: int = 4
+    validators: int = 10
+    transfers: int = 10_000
+    senders: int = 1_000
+    malicious_fraction: float = 0.1
+    min_validators: int = 3
+    committees: int = 0  # 0 sends every transfer to the global top validators
+    assign_by: str = "hash"  # or "chain_pair"
+    # Transfers one committee validates per virtual second, modelling each
+    # committee as its own set of machines; 0 is unlimited
+    committee_throughput: float = 0.0
+    epoch_interval: float = 0.0  # virtual seconds between epochs, which also rotate committees; 0 disables
+    arrival_rate: float = 1_000.0  # transfers per virtual second
+    batch_interval: float = 1.0  # virtual seconds between bridge processing rounds
+    mean_amount: float = 100.0
+    track_memory: bool = False
+
+
+@dataclass
+class Transfer:
+    arrival_time: float
+    sender: str
+    receiver: str
+    amount: float
+    source_chain: str
+    destination_chain: str
+
+
+@dataclass
+class SimulationReport:
+    """Outcome of a run; every field except the wall-clock and memory ones depends only on the config"""
+    transfers: int
+    completed: int
+    rejected: int
+    slashed_validators: int
+    blocks_mined: int
+    epochs: int
+    virtual_duration: float
+    throughput: float  # completed transfers per virtual second
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    wall_time: float
+    wall_throughput: float  # transfers processed per real second
+    peak_memory: Optional[int] = None
+
+    def format(self) -> str:
+        lines = [f"{name:<20} {value}" for name, value in asdict(self).items()]
+        return "\n".join(lines)
+
+
+def generate_workload(config: SimulationConfig, chain_ids: List[str]) -> Iterator[Transfer]:
+    """Seeded stream of transfers with Poisson arrivals"""
+    # Independent streams per dimension, so changing one knob doesn't
+    # reshuffle the others
+    arrivals = random.Random(f"{config.seed}-arrivals")
+    parties = random.Random(f"{config.seed}-parties")
+    amounts = random.Random(f"{config.seed}-amounts")
+    routes = random.Random(f"{config.seed}-routes")
+
+    now = 0.0
+    for _ in range(config.transfers):
+        now += arrivals.expovariate(config.arrival_rate)
+        source_chain, destination_chain = routes.sample(chain_ids, 2)
+        yield Transfer(
+            arrival_time=now,
+            sender=f"user-{parties.randrange(config.senders)}",
+            receiver=f"user-{parties.randrange(config.senders)}",
+            amount=round(amounts.expovariate(1 / config.mean_amount) + 0.01, 2),
+            source_chain=source_chain,
+            destination_chain=destination_chain
+        )
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class NetworkSimulator:
+    """Runs a bridge, its validators and one chain node per chain against a virtual clock"""
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.clock = VirtualClock()
+        self.chain_ids = [f"chain-{i}" for i in range(config.chains)]
+        self.bridge = EnhancedCrossChainBridge(
+            signer=SimulatedSigner(f"atlys-sim-{config.seed}".encode()),
+            clock=self.clock
+        )
+        consensus = self.bridge.consensus_manager
+        consensus.min_validators = config.min_validators
+        consensus.committee_count = config.committees or None
+        consensus.assign_by = config.assign_by
+        consensus.committee_seed = config.seed
+
+        # PoW is not what is being measured, so chain nodes run at difficulty 0
+        self.chains: Dict[str, Blockchain] = {}
+        for chain_id in self.chain_ids:
+            self.chains[chain_id] = Blockchain(difficulty=0)
+            self.bridge.register_chain(chain_id, self.chains[chain_id])
+
+        setup = random.Random(f"{config.seed}-validators")
+        malicious = set(setup.sample(range(config.validators), int(config.validators * config.malicious_fraction)))
+        for i in range(config.validators):
+            validator_class = MaliciousValidator if i in malicious else ValidatorNode
+            validator = validator_class(round(setup.uniform(1_000, 10_000), 2), f"validator-{i}", clock=self.clock)
+            self.bridge.consensus_manager.add_validator(f"validator-{i}", validator)
+
+        # Created transfers wait here until a round has committee capacity for them
+        self.backlog: List[CrossChainTransaction] = []
+        self.submit_times: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.rejected = 0
+        self.blocks_mined = 0
+        self.epochs = 0
+
+    def validate_backlog(self) -> None:
+        """Submit as much of the backlog as the committees can validate this round, oldest first"""
+        config = self.config
+        consensus = self.bridge.consensus_manager
+        if not self.backlog:
+            return
+        if config.committee_throughput <= 0:
+            batch, self.backlog = self.backlog, []
+        else:
+            capacity = max(1, int(config.committee_throughput * config.batch_interval))
+            used: Dict[int, int] = {}
+            batch, waiting = [], []
+            for transaction in self.backlog:
+                index = consensus.committee_index(transaction) if consensus.committee_count else 0
+                if used.get(index, 0) < capacity:
+                    used[index] = used.get(index, 0) + 1
+                    batch.append(transaction)
+                else:
+                    waiting.append(transaction)
+            self.backlog = waiting
+
+        self.bridge.submit_transfers(batch)
+        for transaction in batch:
+            if transaction.status == "rejected":
+                del self.submit_times[transaction.tx_hash]
+                self.rejected += 1
+
+    def settle(self) -> None:
+        """Run one bridge processing round and record the transfers on their chains"""
+        already_completed = len(self.bridge.completed_transactions)
+        self.bridge.process_pending_transactions()
+        now = self.clock()
+        for transaction in self.bridge.completed_transactions[already_completed:]:
+            self.latencies.append(now - self.submit_times.pop(transaction.tx_hash))
+            self.chains[transaction.source_chain].add_transaction(transaction.sender, "bridge", transaction.amount)
+            self.chains[transaction.destination_chain].add_transaction("bridge", transaction.receiver, transaction.amount)
+
+        for chain in self.chains.values():
+            if chain.pending_transactions:
+                tip = chain.get_latest_block()
+                chain.add_block(Block(tip.index + 1, chain.pending_transactions, tip.hash))
+                self.blocks_mined += 1
+
+    def run_round(self, timestamp: float, next_epoch: float) -> float:
+        """Advance to a round boundary, close any epoch that ended, validate and settle; returns the next epoch time"""
+        self.clock.advance_to(timestamp)
+        while self.config.epoch_interval > 0 and timestamp >= next_epoch:
+            self.bridge.consensus_manager.process_epoch()
+            self.epochs += 1
+            next_epoch += self.config.epoch_interval
+        self.validate_backlog()
+        self.settle()
+        return next_epoch
+
+    def run(self) -> SimulationReport:
+        config = self.config
+        if config.track_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+
+        next_batch = config.batch_interval
+        next_epoch = config.epoch_interval
+        for transfer in generate_workload(config, self.chain_ids):
+            while transfer.arrival_time >= next_batch:
+                next_epoch = self.run_round(next_batch, next_epoch)
+                next_batch += config.batch_interval
+            self.clock.advance_to(transfer.arrival_time)
+
+            transaction = self.bridge.create_transfer(
+                sender=transfer.sender,
+                receiver=transfer.receiver,
+                amount=transfer.amount,
+                source_chain=transfer.source_chain,
+                destination_chain=transfer.destination_chain
+            )
+            self.submit_times[transaction.tx_hash] = transfer.arrival_time
+            self.backlog.append(transaction)
+
+        # Keep running rounds until the committees have worked off the backlog
+        next_epoch = self.run_round(next_batch, next_epoch)
+        while self.backlog:
+            next_batch += config.batch_interval
+            next_epoch = self.run_round(next_batch, next_epoch)
+
+        wall_time = time.perf_counter() - started
+        peak_memory = None
+        if config.track_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        latencies = sorted(self.latencies)
+        virtual_duration = self.clock()
+        return SimulationReport(
+            transfers=config.transfers,
+            completed=len(latencies),
+            rejected=self.rejected,
+            slashed_validators=sum(1 for v in self.bridge.consensus_manager.validators.values() if v.slashed),
+            blocks_mined=self.blocks_mined,
+            epochs=self.epochs,
+            virtual_duration=virtual_duration,
+            throughput=len(latencies) / virtual_duration if virtual_duration else 0.0,
+            latency_p50=percentile(latencies, 0.50),
+            latency_p95=percentile(latencies, 0.95),
+            latency_p99=percentile(latencies, 0.99),
+            wall_time=wall_time,
+            wall_throughput=config.transfers / wall_time if wall_time else 0.0,
+            peak_memory=peak_memory
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a deterministic ATLYS network simulation")
+    defaults = SimulationConfig()
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--chains", type=int, default=defaults.chains)
+    parser.add_argument("--validators", type=int, default=defaults.validators)
+    parser.add_argument("--transfers", type=int, default=defaults.transfers)
+    parser.add_argument("--senders", type=int, default=defaults.senders)
+    parser.add_argument("--malicious-fraction", type=float, default=defaults.malicious_fraction)
+    parser.add_argument("--min-validators", type=int, default=defaults.min_validators)
+    parser.add_argument("--committees", type=int, default=defaults.committees)
+    parser.add_argument("--assign-by", choices=("hash", "chain_pair"), default=defaults.assign_by)
+    parser.add_argument("--committee-throughput", type=float, default=defaults.committee_throughput)
+    parser.add_argument("--epoch-interval", type=float, default=defaults.epoch_interval)
+    parser.add_argument("--arrival-rate", type=float, default=defaults.arrival_rate)
+    parser.add_argument("--batch-interval", type=float, default=defaults.batch_interval)
+    parser.add_argument("--track-memory", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(**{name: value for name, value in vars(args).items()})
+    print(NetworkSimulator(config).run().format())
+
+
+if __name__ == "__main__":
+    main()
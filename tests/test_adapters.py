@@ -0,0 +1,374 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from atlys.core.atlas_protocol import EnhancedCrossChainBridge, ValidatorNode
+from atlys.core.atlys_adapters import EvmRpcAdapter, JsonRpcClient, RpcError
+from atlys.core.atlys_journal import BridgeJournal
+from atlys.simulation.atlys_simulator import SimulatedSigner
+
+LOCK = "0x11111111"
+RELEASE = "0x22222222"
+LOCKED = "0x33333333"
+RELEASED = "0x44444444"
+
+
+class StandInChain:
+    """In-process EVM JSON-RPC endpoint that mines each call into its own block unless told to wait"""
+    def __init__(self, automine=True):
+        self.automine = automine
+        self.block_number = 0
+        self.unmined = []
+        self.receipts = {}
+        self.calls = []
+        self.connections = 0
+        self.reverting_accounts = set()
+        self.executed = {}  # block in which the contract processed each lock or release of a transfer id
+        self.rejected_sends = 0  # answer this many sends with an error object
+        self.hang_up = False  # handle the next request, then drop the connection unanswered
+        self.lock = threading.Lock()
+
+        chain = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with chain.lock:
+                    chain.connections += 1
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with chain.lock:
+                    if isinstance(payload, list):
+                        result = [chain.handle(request) for request in reversed(payload)]
+                    else:
+                        result = chain.handle(payload)
+                    if chain.hang_up:
+                        chain.hang_up = False
+                        self.close_connection = True
+                        return
+                body = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def _mine_block(self):
+        self.block_number += 1
+        for tx_hash, transfer_id, account in self.unmined:
+            succeeded = account not in self.reverting_accounts and transfer_id not in self.executed
+            if succeeded:
+                self.executed[transfer_id] = self.block_number
+            self.receipts[tx_hash] = {"blockNumber": hex(self.block_number), "status": "0x1" if succeeded else "0x0"}
+        self.unmined = []
+
+    def mine(self, blocks=1):
+        with self.lock:
+            for _ in range(blocks):
+                self._mine_block()
+
+    def drop_unmined(self):
+        with self.lock:
+            self.unmined = []
+
+    def handle(self, request):
+        method, params = request["method"], request["params"]
+        self.calls.append(method)
+        if method == "eth_sendTransaction":
+            data = params[0]["data"]
+            selector, transfer_id, account = data[:10], data[10:74], "0x" + data[10 + 64 + 24:10 + 128]
+            if selector not in (LOCK, RELEASE):
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "unknown method"}}
+            if self.rejected_sends:
+                self.rejected_sends -= 1
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "nonce too low"}}
+            tx_hash = "0x%064x" % len(self.calls)
+            self.unmined.append((tx_hash, selector + transfer_id, account))
+            if self.automine:
+                self._mine_block()
+            result = tx_hash
+        elif method == "eth_getTransactionReceipt":
+            result = self.receipts.get(params[0])
+        elif method == "eth_blockNumber":
+            result = hex(self.block_number)
+        elif method == "eth_call":
+            data, block = params[0]["data"], params[1]
+            key = {LOCKED: LOCK, RELEASED: RELEASE}[data[:10]] + data[10:74]
+            limit = self.block_number if block == "latest" else int(block, 16)
+            result = "0x%064x" % (self.executed.get(key, limit + 1) <= limit)
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def chains():
+    started = {"source": StandInChain(), "destination": StandInChain()}
+    yield started
+    for chain in started.values():
+        chain.close()
+
+
+def make_bridge(chains, journal=None, clock=time.time, **adapter_options):
+    bridge = EnhancedCrossChainBridge(
+        signer=SimulatedSigner(b"adapter-test"), journal=journal, clock=clock, resubmit_after=30
+    )
+    adapters = {}
+    for chain_id, chain in chains.items():
+        adapters[chain_id] = bridge.register_external_chain(chain_id, EvmRpcAdapter(
+            chain.url, "0x" + "b" * 40, "0x" + "c" * 40,
+            lock_selector=LOCK, release_selector=RELEASE, locked_selector=LOCKED, released_selector=RELEASED,
+            client=JsonRpcClient(chain.url), **adapter_options
+        ))
+    for i in range(3):
+        bridge.consensus_manager.add_validator(f"v{i}", ValidatorNode(100, f"key{i}"))
+    return bridge, adapters
+
+
+def account(i):
+    return "0x%040x" % (i + 1)
+
+
+def test_settles_transfers_in_batches_over_one_connection(chains):
+    bridge, adapters = make_bridge(chains)
+    for i in range(50):
+        bridge.initiate_cross_chain_transfer(account(i), account(i + 100), 1.5, "source", "destination")
+
+    bridge.process_pending_transactions()
+
+    assert len(bridge.completed_transactions) == 50
+    assert all(tx.lock_tx and tx.release_tx for tx in bridge.completed_transactions)
+    stats = [adapter.client.stats for adapter in adapters.values()]
+    # Lock, lock receipts, release, release receipts
+    assert sum(s.round_trips for s in stats) == 4
+    assert [s.confirmed for s in stats] == [50, 50]
+    assert sum(s.round_trips_per_confirmed() for s in stats) == pytest.approx(4 / 50)
+    assert chains["source"].calls.count("eth_sendTransaction") == 50
+    assert [chain.connections for chain in chains.values()] == [1, 1]
+
+
+def test_waits_for_confirmations_and_caches_final_receipts(chains):
+    for chain in chains.values():
+        chain.automine = False
+    bridge, adapters = make_bridge(chains, confirmations=3, head_ttl=0.0)
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 2, "source", "destination")
+
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking"
+    chains["source"].mine(2)
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking"
+
+    chains["source"].mine(1)
+    bridge.process_pending_transactions()
+    assert transfer.status == "releasing"
+    chains["destination"].mine(3)
+    bridge.process_pending_transactions()
+    assert transfer.status == "completed"
+    assert bridge.pending_transactions["source"] == []
+
+    source = adapters["source"]
+    round_trips = source.client.stats.round_trips
+    assert source.receipt_statuses([transfer.lock_tx]) == [True]
+    assert source.client.stats.round_trips == round_trips
+    assert source.client.stats.cache_hits == 1
+
+
+def test_refused_and_reverted_calls_fail_the_transfer(chains):
+    bridge, adapters = make_bridge(chains)
+    chains["destination"].reverting_accounts.add(account(9))
+    reverted = bridge.initiate_cross_chain_transfer(account(0), account(9), 1, "source", "destination")
+    not_evm = bridge.initiate_cross_chain_transfer("alice", account(1), 1, "source", "destination")
+    settled = bridge.initiate_cross_chain_transfer(account(2), account(3), 1, "source", "destination")
+
+    bridge.process_pending_transactions()
+
+    assert (reverted.status, not_evm.status, settled.status) == ("failed", "failed", "completed")
+    assert reverted.lock_tx is not None and not_evm.lock_tx is None
+    assert bridge.completed_transactions == [settled]
+
+
+def test_unreachable_endpoint_leaves_transfers_pending(chains):
+    bridge, adapters = make_bridge(chains)
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+    chains["source"].close()
+
+    bridge.process_pending_transactions()
+    assert transfer.status == "validated"
+    assert bridge.pending_transactions["source"] == [transfer]
+
+
+def test_hang_up_after_send_settles_from_the_contract(chains):
+    bridge, _ = make_bridge(chains)
+    chains["source"].hang_up = True
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+
+    # The lock executed but its hash never came back; the contract says it went through
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.lock_tx) == ("completed", None)
+    assert chains["source"].calls.count("eth_sendTransaction") == 1
+    assert chains["source"].calls.count("eth_call") == 1
+
+
+def test_contract_is_read_at_the_confirmed_block(chains):
+    bridge, adapters = make_bridge(chains, confirmations=3, head_ttl=0.0)
+    chains["source"].hang_up = True
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking"
+    assert adapters["source"].executed("lock", [transfer]) == [False]
+    chains["source"].mine(2)
+    assert adapters["source"].executed("lock", [transfer]) == [True]
+    bridge.process_pending_transactions()
+    assert transfer.status == "releasing"
+
+
+def test_node_error_on_send_is_resubmitted_once_the_contract_shows_no_lock(chains):
+    now = [0.0]
+    bridge, _ = make_bridge(chains, clock=lambda: now[0])
+    chains["source"].rejected_sends = 1
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.lock_tx) == ("locking", None)
+    now[0] = 30.0
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.superseded_txs) == ("validated", [])
+    bridge.process_pending_transactions()
+    assert transfer.status == "completed"
+    assert chains["source"].calls.count("eth_sendTransaction") == 2
+
+
+def test_reverted_resubmission_waits_for_the_earlier_call(chains):
+    now = [0.0]
+    source = chains["source"]
+    source.automine = False
+    bridge, _ = make_bridge(chains, clock=lambda: now[0])
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+    bridge.process_pending_transactions()
+    original = transfer.lock_tx
+
+    now[0] = 30.0
+    bridge.process_pending_transactions()
+    bridge.process_pending_transactions()
+    # The original stays in the mempool while the resubmission mines and reverts
+    held, source.unmined = source.unmined[:1], source.unmined[1:]
+    source.reverting_accounts.add(account(0))
+    source.mine()
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking"
+
+    source.reverting_accounts.clear()
+    source.unmined = held
+    source.mine()
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.lock_tx) == ("completed", original)
+
+
+def test_dropped_call_is_resubmitted_after_the_timeout(chains):
+    now = [0.0]
+    chains["source"].automine = False
+    bridge, _ = make_bridge(chains, clock=lambda: now[0])
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+    bridge.process_pending_transactions()
+    dropped = transfer.lock_tx
+    chains["source"].drop_unmined()
+
+    now[0] = 29.0
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.lock_tx) == ("locking", dropped)
+
+    now[0] = 30.0
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.superseded_txs) == ("validated", [dropped])
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking" and transfer.lock_tx != dropped
+
+    chains["source"].mine()
+    bridge.process_pending_transactions()
+    assert transfer.status == "completed"
+    assert chains["source"].calls.count("eth_sendTransaction") == 2
+
+
+def test_late_original_call_settles_a_resubmitted_transfer(chains):
+    now = [0.0]
+    chains["source"].automine = False
+    bridge, _ = make_bridge(chains, clock=lambda: now[0])
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+    bridge.process_pending_transactions()
+    original = transfer.lock_tx
+
+    now[0] = 30.0
+    bridge.process_pending_transactions()
+    bridge.process_pending_transactions()
+    resubmitted = transfer.lock_tx
+    assert resubmitted != original
+
+    # Both calls mine; the resubmission reverts on the repeated transfer id
+    chains["source"].mine()
+    bridge.process_pending_transactions()
+    assert (transfer.status, transfer.lock_tx) == ("completed", original)
+    assert chains["source"].receipts[resubmitted]["status"] == "0x0"
+
+
+def test_timed_out_request_returns_its_pool_slot():
+    with socket.socket() as silent:
+        silent.bind(("127.0.0.1", 0))
+        silent.listen()
+        client = JsonRpcClient(f"http://127.0.0.1:{silent.getsockname()[1]}/", pool_size=1, timeout=0.2)
+        for _ in range(2):
+            with pytest.raises(RpcError, match="timed out"):
+                client.call("eth_blockNumber", [])
+
+
+def test_dropped_connection_only_resends_read_only_calls(chains):
+    chain = chains["source"]
+    client = JsonRpcClient(chain.url, pool_size=1)
+    client.call("eth_blockNumber", [])
+
+    # The request reached the node, so a resend could submit it twice
+    chain.hang_up = True
+    call = {"from": "0x" + "c" * 40, "to": "0x" + "b" * 40, "data": LOCK + "00" * 96}
+    with pytest.raises(RpcError):
+        client.call("eth_sendTransaction", [call])
+    assert chain.calls.count("eth_sendTransaction") == 1
+
+    client.call("eth_blockNumber", [])
+    chain.hang_up = True
+    assert client.call("eth_blockNumber", []) == hex(chain.block_number)
+    assert chain.calls.count("eth_blockNumber") == 4
+
+
+def test_recovery_resumes_transfers_awaiting_receipts(chains, tmp_path):
+    chains["source"].automine = False
+    bridge, _ = make_bridge(chains, journal=BridgeJournal(str(tmp_path)))
+    transfer = bridge.initiate_cross_chain_transfer(account(0), account(1), 1, "source", "destination")
+    bridge.process_pending_transactions()
+    assert transfer.status == "locking"
+
+    recovered, _ = make_bridge(chains, journal=BridgeJournal(str(tmp_path)))
+    recovered.recover_from_journal()
+    [resumed] = recovered.pending_transactions["source"]
+    assert (resumed.status, resumed.lock_tx) == ("locking", transfer.lock_tx)
+
+    chains["source"].mine()
+    recovered.process_pending_transactions()
+    assert resumed.status == "completed"
+    assert chains["source"].calls.count("eth_sendTransaction") == 1
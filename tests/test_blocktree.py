@@ -0,0 +1,62 @@
+from atlys.core.atlys_implementation import Block, Blockchain
+
+
+def mine_on(chain, parent, transactions):
+    block = Block(chain.block_tree.get_node(parent.hash).height + 1, transactions, parent.hash)
+    block.mine_block(chain.difficulty)
+    return block
+
+
+def test_heavier_branch_triggers_reorg_and_restores_state():
+    chain = Blockchain(difficulty=1)
+    genesis = chain.get_latest_block()
+
+    chain.add_transaction("alice", "bob", 5)
+    chain.mine_pending_transactions("miner1")
+    assert chain.get_balance("bob") == 5
+
+    fork_1 = mine_on(chain, genesis, [{"sender": "network", "recipient": "miner2", "amount": 10}])
+    assert chain.add_block(fork_1) is False
+    assert chain.get_balance("bob") == 5
+
+    fork_2 = mine_on(chain, fork_1, [{"sender": "network", "recipient": "miner2", "amount": 10}])
+    assert chain.add_block(fork_2) is True
+
+    assert chain.get_latest_block().hash == fork_2.hash
+    assert [b.hash for b in chain.chain] == [genesis.hash, fork_1.hash, fork_2.hash]
+    assert chain.get_balance("bob") == 0
+    assert chain.get_balance("miner1") == 0
+    assert chain.get_balance("miner2") == 20
+    assert "bob" not in chain.balances
+    assert chain.is_chain_valid()
+    # The disconnected transfer is queued again; the disconnected reward is not
+    assert chain.pending_transactions == [{"sender": "alice", "recipient": "bob", "amount": 5}]
+
+
+def test_blocks_from_peers_clear_their_transactions_from_the_mempool():
+    chain = Blockchain(difficulty=1)
+    chain.add_transaction("alice", "bob", 5)
+    chain.add_transaction("carol", "dave", 7)
+
+    peer_block = mine_on(chain, chain.get_latest_block(), [{"sender": "alice", "recipient": "bob", "amount": 5}])
+    assert chain.add_block(peer_block) is True
+    assert chain.pending_transactions == [{"sender": "carol", "recipient": "dave", "amount": 7}]
+
+    chain.mine_pending_transactions("miner1")
+    assert chain.get_balance("bob") == 5
+    assert chain.pending_transactions == []
+
+
+def test_fork_choice_uses_cumulative_work():
+    chain = Blockchain(difficulty=1)
+    genesis = chain.get_latest_block()
+    chain.mine_pending_transactions("miner1")
+    tip = chain.get_latest_block()
+
+    node = chain.block_tree.get_best_tip()
+    assert node.block.hash == tip.hash
+    assert node.cumulative_work == 2 * chain.get_block_work(tip)
+
+    disconnect, connect = chain.block_tree.find_fork(tip.hash, genesis.hash)
+    assert [n.block.hash for n in disconnect] == [tip.hash]
+    assert connect == []
@@ -0,0 +1,134 @@
+import json
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from atlys.core.atlas_protocol import ConsensusManager, CrossChainTransaction, ValidatorNode
+from atlys.simulation.atlys_simulator import MaliciousValidator, NetworkSimulator, SimulationConfig, SimulatedSigner
+
+
+SIGNER = SimulatedSigner(b"committee-test")
+
+
+def verify(transaction):
+    return SIGNER.verify(transaction.signature, json.dumps(transaction.to_dict(), sort_keys=True).encode())
+
+
+def make_manager(count, committee_count=4, malicious=(), **options):
+    manager = ConsensusManager(clock=lambda: 7200.0, committee_count=committee_count, **options)
+    manager.signature_verifier = verify
+    for i in range(count):
+        validator_class = MaliciousValidator if i in malicious else ValidatorNode
+        manager.add_validator(f"v{i}", validator_class(100 + i, f"key{i}"))
+    return manager
+
+
+def make_transaction(nonce, source_chain="a", destination_chain="b"):
+    transaction = CrossChainTransaction(source_chain, destination_chain, f"user{nonce}", "bob", 1, "ATLYS", nonce)
+    transaction.signature = SIGNER.sign(json.dumps(transaction.to_dict(), sort_keys=True).encode())
+    return transaction
+
+
+def test_committees_are_disjoint_and_rotate_each_epoch():
+    manager = make_manager(20)
+    first = [committee.tolist() for committee in manager.rotate_committees()]
+
+    assert len(first) == 4
+    assert all(len(committee) == manager.min_validators for committee in first)
+    members = [slot for committee in first for slot in committee]
+    assert len(set(members)) == len(members)
+    assert [c.tolist() for c in make_manager(20).rotate_committees()] == first
+
+    manager.process_epoch()
+    assert manager.committees == []
+    assert [committee.tolist() for committee in manager.rotate_committees()] != first
+
+
+def test_slashed_validators_are_never_drawn():
+    manager = make_manager(13)
+    for i in range(0, 13, 2):
+        manager.validators[f"v{i}"].slashed = True
+
+    committees = manager.rotate_committees()
+    assert len(committees) == 2
+    assert not manager.registry.slashed[np.concatenate(committees)].any()
+
+
+def test_verifier_set_after_validators_reaches_them():
+    manager = ConsensusManager(clock=lambda: 7200.0)
+    for i in range(3):
+        manager.add_validator(f"v{i}", ValidatorNode(100, f"key{i}"))
+    assert not manager.validate_transaction(make_transaction(0))
+
+    manager.signature_verifier = verify
+    assert manager.validate_transaction(make_transaction(1))
+
+
+def test_insufficient_validators_for_a_committee():
+    manager = make_manager(2)
+    with pytest.raises(ValueError):
+        manager.validate_transaction(make_transaction(0))
+
+
+def test_chain_pair_assignment_keeps_routes_together():
+    manager = make_manager(30, committee_count=8, assign_by="chain_pair")
+    indexes = {manager.committee_index(make_transaction(nonce)) for nonce in range(20)}
+    assert len(indexes) == 1
+
+    manager = make_manager(30, committee_count=8)
+    indexes = {manager.committee_index(make_transaction(nonce)) for nonce in range(50)}
+    assert len(indexes) > 1
+
+
+def test_batch_matches_one_at_a_time_validation():
+    transactions = [make_transaction(nonce) for nonce in range(40)]
+    batched = make_manager(12, malicious={0, 5})
+    single = make_manager(12, malicious={0, 5})
+
+    results = batched.validate_batch(transactions)
+    assert results == [single.validate_transaction(transaction) for transaction in transactions]
+    assert 0 < sum(results) < len(results)
+    assert np.array_equal(batched.registry.reputation[:12], single.registry.reputation[:12])
+
+
+def test_simulator_throughput_scales_with_committees():
+    def throughput(committees):
+        config = SimulationConfig(
+            validators=40, transfers=1_000, malicious_fraction=0.0,
+            committees=committees, committee_throughput=50.0
+        )
+        report = NetworkSimulator(config).run()
+        assert report.completed == 1_000
+        return report.throughput
+
+    assert throughput(4) > 3 * throughput(1)
+
+
+class CountingValidator(ValidatorNode):
+    """Records how many votes it cast"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.votes = 0
+
+    def validate_transaction(self, transaction):
+        self.votes += 1
+        return super().validate_transaction(transaction)
+
+
+def test_vote_work_per_transfer_stays_constant_as_committees_grow():
+    transactions = [make_transaction(nonce) for nonce in range(64)]
+    for validators, committees in ((12, 4), (48, 16), (192, 64)):
+        manager = ConsensusManager(clock=lambda: 7200.0, committee_count=committees)
+        manager.signature_verifier = verify
+        for i in range(validators):
+            manager.add_validator(f"v{i}", CountingValidator(100 + i, f"key{i}"))
+
+        assert all(manager.validate_batch(transactions))
+        votes = [v.votes for v in manager.validators.values()]
+        # Each transfer is voted on by one committee of min_validators, so
+        # total work is independent of the size of the validator set
+        assert sum(votes) == len(transactions) * manager.min_validators
+        shares = Counter(manager.committee_index(tx) for tx in transactions)
+        for index, committee in enumerate(manager.committees):
+            assert [manager.slot_validators[slot].votes for slot in committee] == [shares[index]] * len(committee)
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from atlys.core.atlys_implementation import Block, Blockchain
+from atlys.core.atlys_index import TransferIndex
+from atlys.core.atlys_merkle import hash_transaction
+
+
+def test_lookup_and_paginated_history():
+    chain = Blockchain(difficulty=1)
+    for i in range(3):
+        chain.add_transaction("alice", "bob", i + 1)
+        chain.add_transaction("bob", "carol", i + 1)
+        chain.mine_pending_transactions("miner1")
+
+    tx_hash = hash_transaction({"sender": "bob", "recipient": "carol", "amount": 2})
+    assert chain.find_transaction(tx_hash) == (2, 1)
+    assert chain.get_transaction(tx_hash)["amount"] == 2
+
+    page, cursor = chain.get_address_history("bob", limit=4)
+    assert page == [(1, 0), (1, 1), (2, 0), (2, 1)]
+    page, cursor = chain.get_address_history("bob", cursor=cursor, limit=4)
+    assert page == [(3, 0), (3, 1)]
+    assert cursor is None
+
+
+def test_reorg_rolls_back_index():
+    chain = Blockchain(difficulty=1)
+    genesis = chain.get_latest_block()
+    chain.add_transaction("alice", "bob", 5)
+    chain.mine_pending_transactions("miner1")
+    tx_hash = hash_transaction({"sender": "alice", "recipient": "bob", "amount": 5})
+    assert chain.find_transaction(tx_hash) == (1, 0)
+
+    parent = genesis
+    for height in (1, 2):
+        block = Block(height, [{"sender": "network", "recipient": "miner2", "amount": 10}], parent.hash)
+        block.mine_block(chain.difficulty)
+        chain.add_block(block)
+        parent = block
+
+    assert chain.find_transaction(tx_hash) is None
+    assert chain.get_address_history("bob") == ([], None)
+    assert chain.get_address_history("miner2")[0] == [(1, 0), (2, 0)]
+
+
+def test_transfer_index_by_chain_pair():
+    index = TransferIndex()
+    for i in range(5):
+        index.add(SimpleNamespace(tx_hash=f"tx{i}", source_chain="a", destination_chain="b" if i % 2 else "c"))
+
+    assert index.get("tx3").destination_chain == "b"
+    page, cursor = index.get_chain_pair("a", "c", limit=2)
+    assert [tx.tx_hash for tx in page] == ["tx0", "tx2"]
+    page, cursor = index.get_chain_pair("a", "c", cursor=cursor, limit=2)
+    assert [tx.tx_hash for tx in page] == ["tx4"]
+    assert cursor is None
@@ -0,0 +1,96 @@
+import os
+
+from atlys.core.atlas_protocol import EnhancedCrossChainBridge, ValidatorNode
+from atlys.core.atlys_journal import BridgeJournal
+from atlys.simulation.atlys_simulator import SimulatedSigner
+
+
+def make_bridge(directory, **journal_options):
+    bridge = EnhancedCrossChainBridge(
+        signer=SimulatedSigner(b"journal-test"),
+        journal=BridgeJournal(str(directory), **journal_options)
+    )
+    for chain_id in ("a", "b"):
+        bridge.register_chain(chain_id, None)
+    for i in range(3):
+        bridge.consensus_manager.add_validator(f"v{i}", ValidatorNode(100, f"key{i}"))
+    return bridge
+
+
+def transfer(bridge, i):
+    return bridge.initiate_cross_chain_transfer(f"user{i % 3}", "bob", i + 1, "a", "b")
+
+
+def test_group_commit_batches_fsyncs(tmp_path):
+    bridge = make_bridge(tmp_path, group_commit_size=1000, group_commit_interval=60)
+    bridge.submit_transfers([
+        bridge.create_transfer(f"user{i % 3}", "bob", i + 1, "a", "b") for i in range(50)
+    ])
+    assert bridge.journal.fsyncs == 1
+    assert bridge.journal.durable_seq == 50
+
+    bridge.process_pending_transactions()
+    assert bridge.journal.fsyncs == 2
+    assert bridge.journal.durable_seq == 100
+
+
+def test_accepted_transfer_is_durable_on_return(tmp_path):
+    bridge = make_bridge(tmp_path, group_commit_size=1000, group_commit_interval=60)
+    accepted = transfer(bridge, 0)
+    assert accepted.status == "validated"
+
+    recovered = make_bridge(tmp_path)
+    recovered.recover_from_journal()
+    assert [tx.tx_hash for tx in recovered.pending_transactions["a"]] == [accepted.tx_hash]
+
+
+def test_recovery_restores_pending_completed_and_archive(tmp_path):
+    bridge = make_bridge(tmp_path, group_commit_size=1, max_completed_in_memory=4, segment_size=2)
+    completed = [transfer(bridge, i) for i in range(10)]
+    bridge.process_pending_transactions()
+    pending = [transfer(bridge, i) for i in range(10, 13)]
+
+    assert len(bridge.completed_transactions) == 4
+    assert len([name for name in os.listdir(tmp_path / "archive") if name.endswith(".jsonl")]) == 3
+    assert bridge.get_transfer(completed[0].tx_hash).amount == 1
+
+    # Recover into a fresh bridge without closing the old journal, as after a crash
+    recovered = make_bridge(tmp_path)
+    recovered.recover_from_journal()
+
+    assert [tx.tx_hash for tx in recovered.pending_transactions["a"]] == [tx.tx_hash for tx in pending]
+    assert [tx.tx_hash for tx in recovered.completed_transactions] == [tx.tx_hash for tx in completed[6:]]
+    assert recovered.sender_nonces == bridge.sender_nonces
+    assert recovered.verify_transaction(recovered.pending_transactions["a"][0])
+    assert recovered.get_transfer(completed[1].tx_hash).tx_hash == completed[1].tx_hash
+
+    recovered.process_pending_transactions()
+    assert len(recovered.completed_transactions) == 7
+    assert recovered.sender_nonces == {"user0": 5, "user1": 4, "user2": 4}
+
+
+def test_checkpoint_truncates_journal(tmp_path):
+    bridge = make_bridge(tmp_path, group_commit_size=1, checkpoint_every=8)
+    for i in range(10):
+        transfer(bridge, i)
+    journal_files = [name for name in os.listdir(tmp_path) if name.startswith("journal-")]
+    assert journal_files == ["journal-000000000009.log"]
+
+    recovered = make_bridge(tmp_path)
+    recovered.recover_from_journal()
+    assert len(recovered.pending_transactions["a"]) == 10
+
+
+def test_archived_transfers_are_found_through_the_index(tmp_path):
+    bridge = make_bridge(tmp_path, max_completed_in_memory=2, segment_size=3)
+    completed = [transfer(bridge, i) for i in range(12)]
+    bridge.process_pending_transactions()
+    archived = completed[:9]
+
+    assert len(bridge.journal._archive_keys) == 9
+    for tx in archived:
+        assert bridge.journal.find_archived(tx.tx_hash)["amount"] == tx.amount
+    assert bridge.journal.find_archived("f" * 64) is None
+
+    reopened = BridgeJournal(str(tmp_path))
+    assert [reopened.find_archived(tx.tx_hash)["tx_hash"] for tx in archived] == [tx.tx_hash for tx in archived]
@@ -0,0 +1,60 @@
+import pytest
+
+from atlys.core.atlys_implementation import Blockchain
+from atlys.core.atlys_lightclient import HEADER_FORMAT, LightChainClient
+from atlys.core.atlys_merkle import build_merkle_proof, compute_merkle_root, hash_pair, hash_transaction
+
+
+def make_chain(blocks):
+    chain = Blockchain(difficulty=1)
+    for i in range(blocks):
+        chain.add_transaction("alice", "bob", i + 1)
+        chain.add_transaction("bob", "carol", i)
+        chain.mine_pending_transactions("miner1")
+    return chain
+
+
+def test_headers_verify_linkage_and_transfer_inclusion():
+    chain = make_chain(3)
+    client = LightChainClient("remote", chain.chain[0].hash, difficulty=1)
+
+    assert client.add_headers([block.get_header() for block in chain.chain[1:]])
+    assert client.tip_height == 3
+    assert client.tip_hash == chain.get_latest_block().hash
+    assert client.memory_usage() == 3 * HEADER_FORMAT.size
+
+    transaction = chain.chain[2].transactions[1]
+    _, proof = chain.chain[2].get_merkle_proof(1)
+    assert client.verify_inclusion(transaction, 2, proof)
+    assert client.verify_inclusion(transaction, 2, proof, min_confirmations=2)
+    assert not client.verify_inclusion(transaction, 2, proof, min_confirmations=3)
+    assert not client.verify_inclusion(transaction, 1, proof)
+    assert not client.verify_inclusion({**transaction, "amount": 1000}, 2, proof)
+
+
+def test_proofs_cover_promoted_odd_nodes():
+    leaves = [hash_transaction({"sender": "a", "recipient": "b", "amount": i}) for i in range(5)]
+    root = compute_merkle_root(leaves)
+    for position in range(5):
+        proof = build_merkle_proof(leaves, position)
+        current = leaves[position]
+        for sibling, on_left in proof:
+            current = hash_pair(sibling, current) if on_left else hash_pair(current, sibling)
+        assert current == root
+
+    # An odd last node is promoted, not duplicated, so padding the list changes the root
+    assert compute_merkle_root(leaves + [leaves[-1]]) != root
+
+
+def test_rejects_unlinked_headers():
+    chain = make_chain(2)
+    client = LightChainClient("remote", chain.chain[0].hash, difficulty=1)
+
+    with pytest.raises(ValueError):
+        client.add_headers([chain.chain[2].get_header()])
+
+    header = chain.chain[1].get_header()
+    header.previous_hash = "ab" * 32
+    with pytest.raises(ValueError):
+        client.add_headers([header])
+    assert client.tip_height == 0
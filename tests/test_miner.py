@@ -0,0 +1,95 @@
+import threading
+import time
+
+from atlys.core.atlys_implementation import Block, Blockchain, BlockTemplate, Miner
+
+
+def test_template_hashing_matches_block_hash():
+    template = BlockTemplate(1, "ab" * 32, {"sender": "network", "recipient": "miner1", "amount": 10})
+    template.refresh([{"sender": "alice", "recipient": "bob", "amount": 5}])
+    for nonce in (0, 7, 123456):
+        assert template.hash_nonce(nonce) == template.to_block(nonce).hash
+
+
+def test_refresh_adds_new_mempool_transactions():
+    chain = Blockchain(difficulty=1)
+    chain.add_transaction("alice", "bob", 5)
+    template = BlockTemplate(1, chain.get_latest_block().hash, {"sender": "network", "recipient": "m", "amount": 10})
+    template.refresh(chain.pending_transactions)
+
+    chain.add_transaction("carol", "dave", 500)
+    assert template.refresh(chain.pending_transactions) == 1
+    assert [tx["amount"] for tx in template.to_block(0).transactions] == [5, 500, 10]
+
+
+def test_mined_block_keeps_later_arrivals_queued():
+    chain = Blockchain(difficulty=1)
+    chain.add_transaction("alice", "bob", 5)
+    miner = Miner(chain, "miner1")
+    block = miner.mine_block()
+
+    assert chain.get_latest_block() is block
+    assert chain.pending_transactions == []
+    assert chain.get_balance("miner1") == chain.mining_reward
+    assert miner.stats.blocks_found == 1
+
+
+def run_in_thread(miner):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(block=miner.mine_block()))
+    thread.start()
+    return thread, result
+
+
+def test_cancel_stops_mining_promptly():
+    chain = Blockchain(difficulty=20)
+    miner = Miner(chain, "miner1", check_every=256)
+    thread, result = run_in_thread(miner)
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    miner.cancel()
+    thread.join(1)
+    assert time.monotonic() - started < 0.1
+    assert result["block"] is None
+    assert miner.stats.aborted == 1
+    assert miner.stats.wasted_hashes == miner.stats.hashes > 0
+
+
+def test_new_tip_aborts_stale_template():
+    chain = Blockchain(difficulty=20)
+    miner = Miner(chain, "miner1", check_every=256)
+    thread, result = run_in_thread(miner)
+    time.sleep(0.05)
+
+    # Lower the bar so a competing block can be found quickly
+    chain.difficulty = 1
+    competing = Block(1, [], chain.get_latest_block().hash)
+    competing.mine_block(chain.difficulty)
+    chain.add_block(competing)
+
+    thread.join(1)
+    assert not thread.is_alive()
+    assert result["block"] is None
+    assert miner.stats.aborted == 1
+
+
+def test_stale_block_keeps_mempool_and_is_not_counted():
+    chain = Blockchain(difficulty=1)
+    chain.add_transaction("alice", "bob", 5)
+    miner = Miner(chain, "miner1")
+    genesis = chain.get_latest_block()
+    template = BlockTemplate(1, genesis.hash, {"sender": "network", "recipient": "miner1", "amount": 10})
+    template.refresh(chain.pending_transactions)
+
+    competing = Block(1, [{"sender": "network", "recipient": "miner2", "amount": 10}], genesis.hash)
+    competing.mine_block(chain.difficulty)
+    chain.add_block(competing)
+
+    nonce = next(n for n in range(100_000) if template.hash_nonce(n).startswith("0"))
+    assert miner._submit(template, nonce) is None
+    assert chain.get_latest_block() is competing
+    assert chain.pending_transactions == [{"sender": "alice", "recipient": "bob", "amount": 5}]
+    assert miner.stats.blocks_found == 0
+    assert miner.stats.stale_blocks == 1
+    assert miner.stats.wasted_hashes == template.hashes
@@ -0,0 +1,38 @@
+import json
+import sys
+
+import pytest
+
+from atlys.node.atlys_node import Node, NodeConfig, main
+
+
+def test_minimal_node_skips_optional_subsystems():
+    node = Node(NodeConfig(difficulty=1))
+    node.start()
+
+    assert node.blockchain.get_latest_block().index == 0
+    assert node.bridge is None and node.app is None
+    assert "atlys.networking.atlys_networking" not in sys.modules
+    assert [label for label, _ in node.profile.steps] == [
+        "import atlys.core.atlys_implementation",
+        "init chain"
+    ]
+
+
+def test_cli_mines_and_profiles_startup(tmp_path, capsys):
+    config_path = tmp_path / "node.json"
+    config_path.write_text(json.dumps({"difficulty": 1, "miner_address": "miner1", "smart_contracts": True}))
+
+    main(["--config", str(config_path), "--mine", "2", "--profile-startup"])
+
+    output = capsys.readouterr().out
+    assert "startup profile (ms)" in output
+    assert "import atlys.smart_contracts.atlys_smartcontract" in output
+    assert "Length: 3" in output
+
+
+def test_unknown_config_key_is_rejected(tmp_path):
+    config_path = tmp_path / "node.json"
+    config_path.write_text(json.dumps({"dificulty": 1}))
+    with pytest.raises(ValueError):
+        NodeConfig.from_file(str(config_path))
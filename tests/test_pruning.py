@@ -0,0 +1,65 @@
+from atlys.core.atlys_implementation import Blockchain
+from atlys.core.atlys_merkle import hash_transaction
+from atlys.core.atlys_snapshot import list_snapshots
+
+
+def test_pruned_node_keeps_headers_and_state(tmp_path):
+    chain = Blockchain(difficulty=1, prune_depth=2, snapshot_interval=3, snapshot_dir=str(tmp_path))
+    for i in range(10):
+        chain.add_transaction("alice", "bob", 1)
+        chain.mine_pending_transactions("miner1")
+
+    assert chain.pruned_height == 8
+    assert all(block.transactions is None for block in chain.chain[1:9])
+    assert all(block.transactions is not None for block in chain.chain[9:])
+    assert len(chain.block_tree.nodes) == 3
+    assert chain.is_chain_valid()
+    assert chain.get_balance("bob") == 10
+    assert chain.get_balance("miner1") == 100
+    assert len(list_snapshots(str(tmp_path))) == 2
+
+
+def test_restart_from_snapshot_and_recent_blocks(tmp_path):
+    chain = Blockchain(difficulty=1, prune_depth=2, snapshot_interval=3, snapshot_dir=str(tmp_path))
+    for i in range(9):
+        chain.add_transaction("alice", "bob", 1)
+        chain.mine_pending_transactions("miner1")
+
+    restored = Blockchain.from_snapshot_dir(str(tmp_path), difficulty=1, prune_depth=2)
+    assert restored.base_height == 7
+    assert restored.get_balance("bob") == 7
+
+    for block in chain.chain[8:]:
+        restored.add_block(block)
+    assert restored.get_latest_block().hash == chain.get_latest_block().hash
+    assert restored.balances == chain.balances
+
+
+def test_pruning_trims_the_index():
+    chain = Blockchain(difficulty=1, prune_depth=2)
+    for i in range(6):
+        chain.add_transaction("alice", f"user{i}", i + 1)
+        chain.mine_pending_transactions("miner1")
+
+    assert chain.pruned_height == 4
+    assert chain.find_transaction(hash_transaction({"sender": "alice", "recipient": "user0", "amount": 1})) is None
+    assert "user3" not in chain.tx_index.address_history
+    assert chain.get_transaction(hash_transaction({"sender": "alice", "recipient": "user5", "amount": 6}))["amount"] == 6
+
+    history, _ = chain.get_address_history("alice")
+    assert [height for height, _ in history] == [5, 6]
+
+
+def test_repeated_transactions_stay_indexed_until_their_last_block_goes():
+    chain = Blockchain(difficulty=1, prune_depth=2)
+    for i in range(6):
+        chain.add_transaction("alice", "bob", 1)
+        chain.mine_pending_transactions("miner1")
+
+    tx_hash = hash_transaction({"sender": "alice", "recipient": "bob", "amount": 1})
+    assert chain.get_block(6).transactions[0] == chain.get_transaction(tx_hash)
+    assert chain.find_transaction(tx_hash) == (6, 0)
+    assert chain.tx_index.find_all(tx_hash) == [(5, 0), (6, 0)]
+
+    chain.tx_index.remove_block(6, chain.get_block(6).transactions, chain.get_block(6).get_transaction_hashes())
+    assert chain.find_transaction(tx_hash) == (5, 0)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from atlys.core.atlas_protocol import ConsensusManager, ValidatorNode
+from atlys.core.atlys_registry import ValidatorRegistry
+
+
+def make_manager(stakes):
+    manager = ConsensusManager(clock=lambda: 7200.0)
+    for i, stake in enumerate(stakes):
+        manager.add_validator(f"v{i}", ValidatorNode(stake, f"key{i}"))
+    return manager
+
+
+def test_views_read_and_write_shared_registry():
+    manager = make_manager([10, 30, 20])
+    validator = manager.validators["v1"]
+
+    assert validator.registry is manager.registry
+    assert validator.stake_amount == 30.0
+    validator.reputation_score = 50
+    assert manager.registry.reputation[validator.slot] == 50.0
+
+    validator.update_reputation(True)
+    assert validator.reputation_score == 51.0
+    assert validator.validated_transactions == 1
+
+
+def test_selection_matches_reputation_then_stake_then_order():
+    manager = make_manager([10, 30, 30, 20])
+    manager.validators["v3"].reputation_score = 100
+    manager.validators["v1"].reputation_score = 90
+    manager.validators["v0"].slashed = True
+
+    expected = sorted(
+        [v for v in manager.validators.values() if not v.slashed],
+        key=lambda v: (v.reputation_score, v.stake_amount),
+        reverse=True
+    )[:manager.min_validators]
+    assert manager.get_active_validators() == expected
+
+
+def test_directly_inserted_validators_are_adopted():
+    manager = ConsensusManager()
+    for i in range(3):
+        manager.validators[f"v{i}"] = ValidatorNode(10 + i, f"key{i}")
+    assert [v.public_key for v in manager.get_active_validators()] == ["key2", "key1", "key0"]
+    assert len(manager.registry) == 3
+
+
+def test_epoch_decays_slashes_and_redistributes():
+    registry = ValidatorRegistry(capacity=2)
+    registry.add("idle", 100.0, last_validation_time=0.0)
+    registry.add("bad", 100.0, reputation=10.0, last_validation_time=9000.0)
+    registry.add("good", 300.0, last_validation_time=9000.0)
+
+    result = registry.process_epoch(now=9000.0, reward=50.0, idle_period=3600.0, decay_rate=0.5)
+
+    assert result.decayed == 1
+    assert result.slashed == ["bad"]
+    assert result.slashed_stake == 50.0
+    assert result.rewards_paid == 100.0
+    # idle: 100 stake at reputation 50 vs good: 300 stake at reputation 100
+    assert registry.stake[:3] == pytest.approx([100 + 100 / 7, 50.0, 300 + 600 / 7])
+    assert np.array_equal(registry.slashed[:3], [False, True, False])
+
+
+def test_consensus_manager_epoch_uses_clock():
+    manager = make_manager([10, 10, 10])
+    result = manager.process_epoch(reward=30.0)
+    assert result.decayed == 3
+    assert manager.registry.stake[:3].sum() == pytest.approx(60.0)
+
+
+def test_unselected_validators_are_not_slashed_for_idling():
+    clock = [0.0]
+    manager = ConsensusManager(clock=lambda: clock[0])
+    for i in range(10):
+        manager.add_validator(f"v{i}", ValidatorNode(100, f"key{i}"))
+
+    for epoch in range(40):
+        clock[0] = (epoch + 1) * 3600.0
+        manager.registry.record_votes(manager.registry.top_active(3), np.ones(3, dtype=bool), clock[0])
+        result = manager.process_epoch()
+        assert result.slashed == []
+    assert manager.registry.stake[:10].sum() == pytest.approx(1000.0)
+
+
+def test_removed_validators_leave_the_registry():
+    manager = make_manager([10, 30, 20, 40])
+    removed = manager.remove_validator("v1")
+    manager.remove_validator("v3")
+
+    assert [v.public_key for v in manager.get_active_validators()] == ["key2", "key0"]
+    assert manager.registry.ids == ["v0", "v2"]
+    assert manager.validators["v2"].stake_amount == 20.0
+    assert removed.stake_amount == 30.0 and removed.registry is not manager.registry
+
+    manager.add_validator("v1", removed)
+    assert [v.public_key for v in manager.get_active_validators()] == ["key1", "key2", "key0"]
+
+
+def test_validators_merged_or_assigned_directly_are_reconciled():
+    manager = make_manager([10, 30])
+    manager.validators |= {"v2": ValidatorNode(20, "key2")}
+    assert [v.public_key for v in manager.get_active_validators()] == ["key1", "key2", "key0"]
+
+    manager.validators = {"v0": manager.validators["v0"], "v3": ValidatorNode(5, "key3"), "v4": ValidatorNode(1, "key4")}
+    assert [v.public_key for v in manager.get_active_validators()] == ["key0", "key3", "key4"]
+    assert manager.registry.ids == ["v0", "v3", "v4"]
@@ -0,0 +1,61 @@
+from dataclasses import asdict
+
+import pytest
+
+from atlys.core.atlas_protocol import ValidatorNode
+from atlys.simulation.atlys_simulator import NetworkSimulator, SimulationConfig, VirtualClock
+
+# Fields that depend on the host rather than on the seed
+HOST_FIELDS = ("wall_time", "wall_throughput", "peak_memory")
+
+
+def deterministic_fields(report):
+    return {k: v for k, v in asdict(report).items() if k not in HOST_FIELDS}
+
+
+def test_same_seed_gives_identical_results():
+    config = SimulationConfig(seed=7, chains=3, validators=6, transfers=300, malicious_fraction=0.5)
+    first = NetworkSimulator(config).run()
+    second = NetworkSimulator(config).run()
+
+    assert deterministic_fields(first) == deterministic_fields(second)
+    assert first.completed + first.rejected == 300
+
+
+def test_different_seed_changes_workload():
+    base = SimulationConfig(chains=3, validators=6, transfers=300)
+    first = NetworkSimulator(base).run()
+    second = NetworkSimulator(SimulationConfig(**{**asdict(base), "seed": 1})).run()
+    assert first.latency_p50 != second.latency_p50
+
+
+def test_reputation_uses_injected_clock():
+    simulator = NetworkSimulator(SimulationConfig(validators=3, malicious_fraction=0.0, transfers=0))
+    validator = next(iter(simulator.bridge.consensus_manager.validators.values()))
+    simulator.clock.advance_to(1800.0)
+    validator.update_reputation(False)
+    assert validator.last_validation_time == 1800.0
+    assert validator.reputation_score == 97.5
+
+
+def test_virtual_clock_cannot_go_backwards():
+    clock = VirtualClock(5.0)
+    with pytest.raises(ValueError):
+        clock.advance_to(4.0)
+
+
+def test_directly_inserted_validators_reject_forged_signatures():
+    simulator = NetworkSimulator(SimulationConfig(validators=0, transfers=0))
+    bridge = simulator.bridge
+    for i in range(3):
+        bridge.consensus_manager.validators[f"v{i}"] = ValidatorNode(100, f"key{i}")
+    for chain_id in ("x", "y"):
+        bridge.register_chain(chain_id, None)
+
+    forged = bridge.create_transfer("alice", "bob", 1e6, "x", "y")
+    forged.signature = b"forged"
+    bridge.submit_transfers([forged])
+    assert forged.status == "rejected"
+
+    genuine = bridge.initiate_cross_chain_transfer("alice", "bob", 1, "x", "y")
+    assert genuine.status == "validated"
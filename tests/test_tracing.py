@@ -0,0 +1,54 @@
+import json
+
+from atlys.core.atlys_tracing import TraceFileWriter, TransferTracer
+from atlys.simulation.atlys_simulator import NetworkSimulator, SimulationConfig
+
+
+def run_traced(tmp_path, sample_rate):
+    simulator = NetworkSimulator(SimulationConfig(chains=2, validators=3, malicious_fraction=0.0, transfers=50))
+    tracer = TransferTracer(sample_rate, TraceFileWriter(str(tmp_path / "trace.json")))
+    simulator.bridge.tracer = tracer
+    simulator.run()
+    return tracer
+
+
+def test_traces_every_stage_of_sampled_transfers(tmp_path):
+    tracer = run_traced(tmp_path, 1.0)
+
+    with open(tmp_path / "trace.json") as f:
+        text = f.read()
+    events = json.loads(text.rstrip(",\n") + "]")
+    spans = [event for event in events if event["ph"] == "X"]
+    assert {event["name"] for event in spans} == {"sign", "consensus", "queue_wait", "settle"}
+    assert len(spans) == 4 * 50
+    assert tracer.active == {}
+
+    slowest = tracer.slowest(5)
+    assert len(slowest) == 5
+    assert slowest[0].duration >= slowest[-1].duration
+
+    tracer.dump_slowest(str(tmp_path / "slowest.json"), 3)
+    with open(tmp_path / "slowest.json") as f:
+        dumped = json.load(f)["traceEvents"]
+    assert len({event["args"]["tx_hash"] for event in dumped if event["ph"] == "X"}) == 3
+
+
+def test_sampling_rate_can_change_at_runtime(tmp_path):
+    tracer = run_traced(tmp_path, 0.0)
+    assert tracer.slowest() == []
+
+    tracer.set_sample_rate(0.5)
+    sampled = [h for h in ("00" * 32, "7f" + "00" * 31, "80" + "00" * 31, "ff" * 32) if tracer.is_sampled(h)]
+    assert sampled == ["00" * 32, "7f" + "00" * 31]
+
+
+def test_trace_file_rotates(tmp_path):
+    path = tmp_path / "trace.json"
+    writer = TraceFileWriter(str(path), max_bytes=200, backup_count=2)
+    for i in range(10):
+        writer.write([{"name": "x" * 50, "ph": "X", "ts": i, "dur": 1, "pid": 1, "tid": 1}])
+    writer.close()
+
+    assert path.exists() and (tmp_path / "trace.json.1").exists() and (tmp_path / "trace.json.2").exists()
+    assert not (tmp_path / "trace.json.3").exists()
+    assert (tmp_path / "trace.json.1").read_text().startswith("[\n")